@@ -0,0 +1,131 @@
+import re
+import threading
+from typing import Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from cache import LRUCache
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_SIMILARITY,
+)
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"[\s?.!]+$", "", " ".join(query.lower().split()))
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype="float32")
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """Caches final answers per (document, prompt version, model) scope.
+
+    Lookups match the normalized query text exactly; when a similarity
+    threshold and an `embed_query` function are given, a miss falls back to the
+    cached query in the same scope whose embedding has the highest cosine
+    similarity above the threshold. Entries expire after `ttl` seconds and are
+    evicted least recently used first, together with their query embedding.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl: Optional[float] = ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY,
+    ):
+        self._answers = LRUCache(max_entries=max_entries, ttl=ttl, on_evict=self._forget)
+        self.similarity_threshold = similarity_threshold
+        # scope -> {normalized query: unit query embedding}, for semantic
+        # matching; holds only queries whose answer is still cached
+        self._vectors: Dict[Hashable, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.similarity_threshold > 0
+
+    def get(
+        self,
+        scope: Hashable,
+        query: str,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+    ) -> Optional[str]:
+        normalized = normalize_query(query)
+        answer = self._answers.get((scope, normalized))
+        if answer is not None:
+            self.hits += 1
+            return answer
+
+        if self.semantic and embed_query is not None:
+            answer = self._semantic_get(scope, embed_query(query))
+            if answer is not None:
+                self.semantic_hits += 1
+                return answer
+
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        scope: Hashable,
+        query: str,
+        answer: str,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+    ) -> None:
+        if self._answers.max_entries <= 0:
+            return
+        normalized = normalize_query(query)
+        if self.semantic and embed_query is not None:
+            # Stored first, so that evicting the answer always finds it
+            vector = _unit(embed_query(query))
+            with self._lock:
+                self._vectors.setdefault(scope, {})[normalized] = vector
+        self._answers.put((scope, normalized), answer)
+
+    def _forget(self, key, answer) -> None:
+        scope, normalized = key
+        with self._lock:
+            vectors = self._vectors.get(scope)
+            if vectors is not None:
+                vectors.pop(normalized, None)
+                if not vectors:
+                    del self._vectors[scope]
+
+    def _semantic_get(self, scope: Hashable, vector: List[float]) -> Optional[str]:
+        with self._lock:
+            candidates = list(self._vectors.get(scope, {}).items())
+        if not candidates:
+            return None
+
+        scores = np.stack([cached for _, cached in candidates]) @ _unit(vector)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        best_query = candidates[best][0]
+
+        answer = self._answers.get((scope, best_query))
+        if answer is None:
+            # Expired since the lookup above: forget its embedding too
+            self._forget((scope, best_query), None)
+        return answer
+
+    def clear(self) -> None:
+        self._answers.clear()
+        with self._lock:
+            self._vectors.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._answers),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+
+import gradio as gr
+
+from config import GRADIO_CONCURRENCY, GRADIO_MAX_QUEUE_SIZE, WARM_UP_ON_START
+from jobs import DONE, FAILED, get_ingestion_queue, save_upload
+from utils import warm_up
+
+# Longest wait between indexing progress updates
+PROGRESS_POLL_SECONDS = 0.5
+
+
+def session_id(request):
+    """Identifies the browser session a Gradio request comes from, if any."""
+    return getattr(request, "session_hash", None)
+
+
+def submit_upload(pdf, owner=None):
+    """Store a PDF `owner` uploaded and queue its indexing; returns the job id."""
+    return get_ingestion_queue().submit(os.path.basename(pdf), save_upload(pdf), owner)
+
+
+async def load_upload(pdf, job_id, owner=None):
+    """(vectorstore, chunks) of an uploaded PDF once its job has finished."""
+    queue = get_ingestion_queue()
+    return await asyncio.to_thread(queue.wait, job_id, None, os.path.basename(pdf), owner)
+
+
+async def job_progress(job_id, filename):
+    """Yield status lines for an ingestion job until it finishes.
+
+    Returns as soon as the job is done, without sleeping when it already is.
+    """
+    queue = get_ingestion_queue()
+    while True:
+        status = await asyncio.to_thread(queue.status, job_id)
+        if status["status"] == DONE:
+            yield f"📄 Uploaded: `{filename}` ✅ indexed"
+            return
+        if status["status"] == FAILED:
+            yield f"📄 Error loading `{filename}`: {status['error']}"
+            return
+        yield f"⏳ Indexing `{filename}`: {status['progress']:.0%} — {status['message']}"
+        await asyncio.to_thread(queue.wait_done, job_id, PROGRESS_POLL_SECONDS)
+
+
+async def start_ingestion(pdf, dev_mode, request: gr.Request):
+    """Start indexing as soon as a PDF is uploaded, while the user types."""
+    if pdf is None:
+        yield "No file uploaded."
+        return
+    filename = os.path.basename(pdf)
+    if dev_mode:
+        yield f"📄 Uploaded: `{filename}`"
+        return
+    try:
+        job_id = await asyncio.to_thread(submit_upload, pdf, session_id(request))
+        async for status in job_progress(job_id, filename):
+            yield status
+    except Exception as e:
+        yield f"📄 Error loading `{filename}`: {e}"
+
+
+def configure_queue(demo):
+    """Size the Gradio queue for the app's async handlers.
+
+    Handlers are async generators: they wait on the event loop rather than
+    holding a thread, so the queue can admit many concurrent requests while
+    LLM calls are capped per backend (LLM_MAX_CONCURRENCY).
+    """
+    if int(gr.__version__.split(".")[0]) >= 4:
+        demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY, max_size=GRADIO_MAX_QUEUE_SIZE)
+    else:
+        demo.queue(concurrency_count=GRADIO_CONCURRENCY, max_size=GRADIO_MAX_QUEUE_SIZE)
+
+
+def start_warm_up():
+    """Models and clients are created lazily; warm them up without delaying startup."""
+    # PDF parse workers re-import the app module; they need none of it
+    if WARM_UP_ON_START and multiprocessing.parent_process() is None:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
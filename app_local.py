@@ -1,21 +1,31 @@
+import asyncio
 import os
-import shutil
 import gradio as gr
-from loader import load_vectorstore
-from utils import get_best_answer
-from llm_provider import get_llm
+from app_common import (
+    configure_queue,
+    job_progress,
+    load_upload,
+    session_id,
+    start_ingestion,
+    start_warm_up,
+    submit_upload,
+)
+from utils import astream_best_answer
 from config import OPENAI_MODEL, HF_MODEL
 
 
 # Simple password check for GPT access
 GPT_PASSWORD = os.environ.get("GPT_ACCESS_PASSWORD", "letmein")
 
-def ask_rag_assistant(pdf, question, history, dev_mode, selected_model, password):
+
+async def ask_rag_assistant(pdf, question, history, dev_mode, selected_model, password, request: gr.Request):
     if pdf is None or question.strip() == "":
-        return "❌ Please upload a PDF and enter a question.", history or "", "⚠️ No file uploaded."
+        yield "❌ Please upload a PDF and enter a question.", history or "", "⚠️ No file uploaded."
+        return
 
     if selected_model == "openai" and password != GPT_PASSWORD:
-        return "🔒 Incorrect or missing password for GPT usage.", history or "", "❌ Access denied"
+        yield "🔒 Incorrect or missing password for GPT usage.", history or "", "❌ Access denied"
+        return
 
     filename = os.path.basename(pdf)
 
@@ -23,26 +33,33 @@ def ask_rag_assistant(pdf, question, history, dev_mode, selected_model, password
         fake_answer = f"🧪 [Dev Mode] Would answer: '{question}'"
         new_turn = f"\n\n**❓ You:** {question}\n\n**🧠 Assistant:** {fake_answer}\n"
         updated_history = (history or "") + new_turn
-        return fake_answer, updated_history, f"📄 Uploaded: `{filename}`"
+        yield fake_answer, updated_history, f"📄 Uploaded: `{filename}`"
+        return
 
     try:
-        save_path = os.path.join("documents", filename)
-        if os.path.abspath(pdf) != os.path.abspath(save_path):
-            shutil.copy(pdf, save_path)
-
-        # Inject runtime LLM backend
-        os.environ["LLM_BACKEND"] = selected_model
-
-        vectorstore, split_docs = load_vectorstore(filename)
-        answer = get_best_answer(question, vectorstore, split_docs)
+        # Joins the job started on upload, or starts one
+        owner = session_id(request)
+        job_id = await asyncio.to_thread(submit_upload, pdf, owner)
+        async for status in job_progress(job_id, filename):
+            if not status.startswith("📄"):
+                yield "⏳ Waiting for your PDF to finish indexing...", history or "", status
+
+        vectorstore, split_docs = await load_upload(pdf, job_id, owner)
+
+        # Stream partial answers into the speech bubble as tokens arrive
+        answer = ""
+        async for answer in astream_best_answer(
+            question, vectorstore, split_docs, backend=selected_model
+        ):
+            yield answer, history or "", f"📄 Uploaded: `{filename}`"
 
         new_turn = f"\n\n**❓ You:** {question}\n\n**🧠 Assistant:** {answer}\n"
         updated_history = (history or "") + new_turn
 
-        return answer, updated_history, f"📄 Uploaded: `{filename}`"
+        yield answer, updated_history, f"📄 Uploaded: `{filename}`"
 
     except Exception as e:
-        return f"⚠️ Error: {str(e)}", history or "", f"📄 Error loading `{filename}`"
+        yield f"⚠️ Error: {str(e)}", history or "", f"📄 Error loading `{filename}`"
 
 
 def clear_all():
@@ -264,6 +281,7 @@ with demo:
             return f"⏳ Thinking about: *{question}*", history, "💭 Thinking..."
 
         pdf_input.change(toggle_submit_btn, [pdf_input, question_input], [submit_btn])
+        pdf_input.change(start_ingestion, [pdf_input, dev_toggle], [file_status])
         question_input.change(toggle_submit_btn, [pdf_input, question_input], [submit_btn])
 
         submit_btn.click(
@@ -285,3 +303,6 @@ with demo:
                 file_status, model_selector, password_box
             ]
         )
+
+configure_queue(demo)
+start_warm_up()
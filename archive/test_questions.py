@@ -1,5 +1,4 @@
-from loader import load_vectorstore
-from utils import get_best_answer
+from utils import answer_batch
 
 questions = [
     "What is the main goal of the research?",
@@ -14,13 +13,13 @@ questions = [
     "What limitations does the paper acknowledge?"
 ]
 
-# Change this to test other PDFs
+# Change this to test other PDFs (pairs may mix any number of documents)
 pdf_filename = "TWDpdf.pdf"
 
-vectorstore, split_docs = load_vectorstore(pdf_filename)
+# Loads the PDF once, retrieves for all questions at once and answers them concurrently
+answers = answer_batch([(pdf_filename, question) for question in questions])
 
-for i, question in enumerate(questions, 1):
+for i, (question, answer) in enumerate(zip(questions, answers), 1):
     print(f"\n{'='*80}")
     print(f"🔹 Question {i}: {question}")
-    answer = get_best_answer(question, vectorstore, split_docs)
-    print(f"\n🧠 Answer:\n{answer}")
\ No newline at end of file
+    print(f"\n🧠 Answer:\n{answer}")
@@ -0,0 +1,113 @@
+"""Recall vs latency of the FAISS index types against the exact flat baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ann [--n 200000] [--dim 384] [--queries 1000] [--k 10]
+
+Evaluates synthetic clustered vectors plus the vectors stored in the bundled
+faiss_dbs/*/index.faiss files (queried with perturbed copies of themselves).
+"""
+import argparse
+import glob
+import time
+
+import faiss
+import numpy as np
+
+from faiss_index import INDEX_TYPES, IndexBuilder
+
+
+def synthetic(n, dim, n_queries, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 1000), dim)).astype("float32")
+    xb = centers[rng.integers(len(centers), size=n)] + 0.3 * rng.normal(size=(n, dim)).astype("float32")
+    xq = centers[rng.integers(len(centers), size=n_queries)] + 0.3 * rng.normal(size=(n_queries, dim)).astype("float32")
+    return xb.astype("float32"), xq.astype("float32")
+
+
+def bundled(n_queries, seed=0):
+    """Vectors reconstructed from faiss_dbs, grouped by dimension."""
+    by_dim = {}
+    for path in sorted(glob.glob("faiss_dbs/*/index.faiss")):
+        index = faiss.read_index(path)
+        if index.ntotal:
+            by_dim.setdefault(index.d, []).append(index.reconstruct_n(0, index.ntotal))
+
+    rng = np.random.default_rng(seed)
+    for dim, parts in by_dim.items():
+        xb = np.concatenate(parts).astype("float32")
+        picks = xb[rng.integers(len(xb), size=n_queries)]
+        noise = rng.normal(scale=picks.std() * 0.1, size=picks.shape).astype("float32")
+        yield f"faiss_dbs (d={dim}, n={len(xb)})", xb, picks + noise
+
+
+def build(index_type, quantization, xb):
+    """Index `xb` exactly as the app does; returns (index, description, seconds),
+    or (None, reason, 0) when the settings cannot index these vectors.
+    """
+    start = time.perf_counter()
+    builder = IndexBuilder(index_type, quantization)
+    try:
+        builder.add(xb)
+        index = builder.finish()
+    except ValueError as e:
+        return None, str(e), 0.0
+    return index, builder.description, time.perf_counter() - start
+
+
+def sweep(index):
+    """Query-time settings to try on an index built with the app's defaults."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return [("nprobe", p) for p in (1, 4, 16, 64) if p <= ivf.nlist]
+    if hasattr(index, "hnsw"):
+        return [("efSearch", ef) for ef in (16, 64, 256)]
+    return [None]
+
+
+def recall(found, truth, k):
+    return np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)])
+
+
+def evaluate(name, xb, xq, k):
+    n, dim = xb.shape
+    k = min(k, n)
+    print(f"\n{name}: {n} vectors, d={dim}, {len(xq)} queries, recall@{k}")
+    truth = faiss.IndexFlatL2(dim)
+    truth.add(xb)
+    _, truth = truth.search(xq, k)
+    for index_type in INDEX_TYPES:
+        index, description, build_seconds = build(index_type, "none", xb)
+        if index is None:
+            print(f"  {index_type:>8} skipped: {description}")
+            continue
+
+        for setting in sweep(index):
+            if setting is not None:
+                faiss.ParameterSpace().set_index_parameter(index, *setting)
+            start = time.perf_counter()
+            _, found = index.search(xq, k)
+            per_query = (time.perf_counter() - start) * 1000 / len(xq)
+            label = f"{setting[0]}={setting[1]}" if setting else "exact"
+            print(
+                f"  {index_type:>8} {description:<16} {label:<13} build {build_seconds:6.2f}s  "
+                f"{per_query:7.4f} ms/query  recall {recall(found, truth, k):.3f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, xb, xq in bundled(args.queries):
+        evaluate(name, xb, xq, args.k)
+    xb, xq = synthetic(args.n, args.dim, args.queries)
+    evaluate("synthetic", xb, xq, args.k)
+
+
+if __name__ == "__main__":
+    main()
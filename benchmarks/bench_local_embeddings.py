@@ -0,0 +1,83 @@
+"""Local CPU embedding throughput (chunks/s) by batch size, threads and quantization.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_local_embeddings [pdf ...] [--batch-sizes 8,32,64]
+        [--threads 1,4] [--quantization none,int8] [--repeat 3]
+
+Embeds the chunks of the given PDFs (default: every PDF in documents/) with
+LOCAL_EMBED_MODEL. Requires sentence-transformers. Also reports how closely
+the int8 vectors match the fp32 ones (mean cosine similarity).
+"""
+import argparse
+import glob
+import time
+
+import numpy as np
+
+from config import LOCAL_EMBED_MODEL
+from ingest import load_chunks
+from local_embeddings import LocalEmbeddings
+
+
+def ints(value):
+    return [int(v) for v in value.split(",")]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--model", default=LOCAL_EMBED_MODEL)
+    parser.add_argument("--batch-sizes", type=ints, default=[8, 32, 64])
+    parser.add_argument("--threads", type=ints, default=[1, 4])
+    parser.add_argument("--quantization", default="none,int8")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = [
+        chunk.page_content
+        for pdf in args.pdfs or sorted(glob.glob("documents/*.pdf"))
+        for chunk in load_chunks(pdf)
+    ]
+    print(f"{len(texts)} chunks, model {args.model}")
+
+    start = time.perf_counter()
+    LocalEmbeddings(args.model, quantization="none")
+    print(f"cold model load: {time.perf_counter() - start:.2f}s")
+
+    reference = None
+    print(f"{'quantization':<13} {'threads':>7} {'batch':>6} {'chunks/s':>10} {'cosine':>8}")
+    for quantization in args.quantization.split(","):
+        for threads in args.threads:
+            for batch_size in args.batch_sizes:
+                # Models are cached per process, so only the first config pays the load
+                embeddings = LocalEmbeddings(
+                    args.model, batch_size=batch_size, threads=threads, quantization=quantization
+                )
+                embeddings.embed_documents(texts[:batch_size])  # warm-up
+                seconds, vectors = best_of(args.repeat, lambda: embeddings.embed_documents(texts))
+                vectors = np.asarray(vectors, dtype="float32")
+                if reference is None and quantization == "none":
+                    reference = vectors
+                cosine = (
+                    f"{float(np.mean(np.sum(vectors * reference, axis=1))):8.4f}"
+                    if reference is not None else f"{'-':>8}"
+                )
+                print(
+                    f"{quantization:<13} {threads:>7} {batch_size:>6} "
+                    f"{len(texts) / seconds:>10.1f} {cosine}"
+                )
+
+
+if __name__ == "__main__":
+    main()
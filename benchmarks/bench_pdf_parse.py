@@ -0,0 +1,61 @@
+"""PDF parsing throughput: single-process PyPDFLoader vs the sharded process pool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_parse [pdf ...] [--workers 1,2,4,8] [--repeat 3]
+
+Defaults to every PDF in documents/.
+"""
+import argparse
+import glob
+import os
+import time
+
+from langchain.document_loaders import PyPDFLoader
+
+from ingest import iter_pages_parallel
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--shard-pages", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pdfs = args.pdfs or sorted(glob.glob("documents/*.pdf"))
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    print(f"CPUs available: {os.cpu_count()}")
+
+    for pdf_path in pdfs:
+        baseline, expected = best_of(args.repeat, lambda: PyPDFLoader(pdf_path).load())
+        print(f"\n{pdf_path}: {len(expected)} pages")
+        print(f"  {'PyPDFLoader':>12}: {baseline:7.3f}s")
+
+        for workers in worker_counts:
+            elapsed, pages = best_of(args.repeat, lambda: list(
+                iter_pages_parallel(pdf_path, workers=workers, shard_pages=args.shard_pages)
+            ))
+            same = (
+                [p.page_content for p in pages] == [p.page_content for p in expected]
+                and [p.metadata for p in pages] == [p.metadata for p in expected]
+            )
+            print(
+                f"  {f'{workers} workers':>12}: {elapsed:7.3f}s "
+                f"speedup x{baseline / elapsed:.2f} {'identical' if same else 'MISMATCH'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Index size and recall of the FAISS vector codecs against float32 storage.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_quantization [--n 100000] [--dim 384] [--queries 1000] [--k 10]
+
+For each codec, reports the serialized index size, bytes per vector, and
+recall@k against the exact flat index both straight from the compressed codes
+and after re-ranking FAISS_RERANK_FACTOR x k candidates with the exact vectors.
+"""
+import argparse
+
+import faiss
+
+from benchmarks.bench_ann import build, bundled, recall, synthetic
+from config import FAISS_RERANK_FACTOR
+from faiss_index import QUANTIZATIONS
+from retrieval import _rerank_exact
+
+
+def evaluate(name, xb, xq, k):
+    n, dim = xb.shape
+    k = min(k, n)
+    print(f"\n{name}: {n} vectors, d={dim}, {len(xq)} queries, recall@{k}")
+    truth = faiss.IndexFlatL2(dim)
+    truth.add(xb)
+    _, truth = truth.search(xq, k)
+    for quantization in QUANTIZATIONS:
+        index, description, _ = build("flat", quantization, xb)
+        if index is None:
+            print(f"  {quantization:>5} skipped: {description}")
+            continue
+        size = faiss.serialize_index(index).nbytes
+
+        _, found = index.search(xq, k)
+        _, candidates = index.search(xq, min(n, k * FAISS_RERANK_FACTOR))
+        reranked = _rerank_exact(xq, candidates, xb, k)
+        print(
+            f"  {quantization:>5} {description:<8} {size / 1024 / 1024:8.2f} MB  "
+            f"{size / n:7.1f} B/vector  recall {recall(found, truth, k):.3f}  "
+            f"re-ranked {recall(reranked, truth, k):.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, xb, xq in bundled(args.queries):
+        evaluate(name, xb, xq, args.k)
+    xb, xq = synthetic(args.n, args.dim, args.queries)
+    evaluate("synthetic", xb, xq, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Cold-start cost: module import times and first-use initialization.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup [--repeat 3]
+
+Each measurement runs in a fresh interpreter, so nothing is shared between
+them; the median of --repeat runs is reported. The app modules are skipped
+when gradio is not installed.
+"""
+import argparse
+import importlib.util
+import statistics
+import subprocess
+import sys
+
+IMPORTS = ["config", "loader", "retrieval", "utils", "jobs", "app_local"]
+
+# name -> statement timed after its setup
+FIRST_USE = {
+    "get_embeddings()": ("from loader import get_embeddings", "get_embeddings()"),
+    "get_chains()": ("from utils import get_chains", "get_chains()"),
+    "warm_up()": ("from utils import warm_up", "warm_up()"),
+}
+
+SNIPPET = """
+import time, warnings
+warnings.filterwarnings("ignore")
+{setup}
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(setup, statement, repeat):
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", SNIPPET.format(setup=setup, statement=statement)],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            error = (result.stderr.strip().splitlines() or ["failed"])[-1]
+            return None, error
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times), None
+
+
+def report(label, seconds, error):
+    if error:
+        print(f"  {label:<20} error: {error}")
+    else:
+        print(f"  {label:<20} {seconds * 1000:8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("import (cold interpreter)")
+    for module in IMPORTS:
+        if module.startswith("app_") and importlib.util.find_spec("gradio") is None:
+            print(f"  {module:<20} skipped (gradio not installed)")
+            continue
+        report(module, *measure("", f"import {module}", args.repeat))
+
+    print("first use (after import)")
+    for label, (setup, statement) in FIRST_USE.items():
+        report(label, *measure(setup, statement, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
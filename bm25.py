@@ -0,0 +1,132 @@
+import json
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import BM25_K1, BM25_B
+
+# Files a BM25 index adds to a chunk store directory
+TERMS_FILE = "bm25_terms.json"       # term -> [first posting, posting count]
+POSTINGS_FILE = "bm25_postings.bin"  # uint32 (chunk id, term frequency) pairs, grouped by term
+LENGTHS_FILE = "bm25_lengths.bin"    # uint32 token count per chunk
+
+# Keeps identifiers such as gene names (BRCA1, IL-6, p53) as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about an and are as at be by can did do does for from has have how i in is
+it its of on or that the their there these this to was were what when where
+which who why will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Builder:
+    """Accumulates an inverted index over chunks added in chunk id order."""
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}
+        self._lengths = array("I")
+
+    @classmethod
+    def load(cls, directory: str, count: int) -> Optional["BM25Builder"]:
+        """Reopen a written index to append to it, keeping chunks below `count`."""
+        if not os.path.exists(os.path.join(directory, TERMS_FILE)):
+            return None
+        index = BM25Index(directory)
+        builder = cls()
+        builder._lengths = array("I", index.lengths[:count])
+        for term, (start, size) in index.terms.items():
+            pairs = array("I", index.postings[2 * start:2 * (start + size)])
+            kept = array("I")
+            for i in range(0, len(pairs), 2):
+                if pairs[i] < count:
+                    kept.extend(pairs[i:i + 2])
+            if kept:
+                builder._postings[term] = kept
+        return builder
+
+    def add(self, text: str) -> None:
+        chunk_id = len(self._lengths)
+        tokens = tokenize(text)
+        self._lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self._postings.setdefault(term, array("I")).extend((chunk_id, tf))
+
+    def write(self, directory: str) -> None:
+        terms = {}
+        postings = array("I")
+        for term in sorted(self._postings):
+            terms[term] = [len(postings) // 2, len(self._postings[term]) // 2]
+            postings.extend(self._postings[term])
+        for name, dump, mode in (
+            (POSTINGS_FILE, postings.tofile, "wb"),
+            (LENGTHS_FILE, self._lengths.tofile, "wb"),
+            (TERMS_FILE, lambda f: json.dump(terms, f), "w"),
+        ):
+            path = os.path.join(directory, name)
+            with open(f"{path}.tmp", mode) as f:
+                dump(f)
+            os.replace(f"{path}.tmp", path)
+
+
+class BM25Index:
+    """Okapi BM25 over one chunk store, as written by BM25Builder.
+
+    Postings and chunk lengths are memory-mapped; only the term dictionary is
+    parsed on open. A query touches just the postings of its own terms.
+    """
+
+    def __init__(self, directory: str, k1: float = BM25_K1, b: float = BM25_B):
+        import numpy as np
+
+        self.k1 = k1
+        self.b = b
+        with open(os.path.join(directory, TERMS_FILE)) as f:
+            self.terms: Dict[str, List[int]] = json.load(f)
+        self.postings = self._map(np, os.path.join(directory, POSTINGS_FILE))
+        self.lengths = self._map(np, os.path.join(directory, LENGTHS_FILE))
+        self.avg_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], directory: str) -> "BM25Index":
+        builder = BM25Builder()
+        for text in texts:
+            builder.add(text)
+        builder.write(directory)
+        return cls(directory)
+
+    @staticmethod
+    def _map(np, path):
+        if not os.path.getsize(path):
+            return np.zeros(0, dtype="uint32")
+        return np.memmap(path, dtype="uint32", mode="r")
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """(chunk id, score) of the k best-scoring chunks, best first."""
+        import numpy as np
+
+        if not len(self):
+            return []
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            start, size = entry
+            pairs = np.asarray(self.postings[2 * start:2 * (start + size)]).reshape(-1, 2)
+            ids, tf = pairs[:, 0], pairs[:, 1].astype("float64")
+            idf = math.log(1 + (len(self) - size + 0.5) / (size + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[ids] / (self.avg_length or 1))
+            for chunk_id, score in zip(ids.tolist(), (idf * tf * (self.k1 + 1) / (tf + norm)).tolist()):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and, optionally, by size.
+
+    `sizeof` returns the approximate size in bytes of a cached value; it is only
+    consulted when `max_bytes` is set. Entries older than `ttl` seconds are
+    treated as missing. A `max_entries` of 0 disables the cache. `on_evict` is
+    called with (key, value) for entries dropped by eviction or expiry; it runs
+    under the cache lock, so it must not call back into the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._stored_at = {}
+        self._sizeof = sizeof or (lambda value: 0)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            if self.ttl is not None and time.monotonic() - self._stored_at[key] > self.ttl:
+                self._evict_key(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            # Larger than the whole budget: never worth caching
+            self.pop(key)
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._stored_at[key] = time.monotonic()
+            self._total_bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._stored_at.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _evict(self) -> None:
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes and self._total_bytes > self.max_bytes)
+        ):
+            self._evict_key(next(iter(self._data)))
+
+    def _evict_key(self, key: Hashable) -> None:
+        value = self._remove(key)
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _remove(self, key: Hashable) -> Any:
+        self._total_bytes -= self._sizes.pop(key)
+        del self._stored_at[key]
+        return self._data.pop(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
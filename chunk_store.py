@@ -0,0 +1,265 @@
+import json
+import mmap
+import os
+import shutil
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from langchain.docstore.base import Docstore
+from langchain.schema.document import Document
+
+from bm25 import BM25Builder, BM25Index, LENGTHS_FILE, POSTINGS_FILE, TERMS_FILE
+from config import FALLBACK_SECTIONS
+
+# Files making up a chunk store directory
+TEXT_FILE = "text.bin"        # UTF-8 chunk texts, back to back
+OFFSETS_FILE = "offsets.bin"  # uint64 byte offsets into text.bin, one per chunk plus the end
+META_FILE = "meta.json"       # metadata columns: {key: [value per chunk]}
+SECTIONS_FILE = "sections.json"  # chunk id -> detected FALLBACK_SECTIONS name
+
+
+def detect_section(text: str) -> Optional[str]:
+    """The first FALLBACK_SECTIONS name the chunk mentions, if any."""
+    text = text.lower()
+    for section in FALLBACK_SECTIONS:
+        if section in text:
+            return section
+    return None
+
+
+class ChunkStoreWriter:
+    """Appends chunks to a new chunk store, then renames it into place on close.
+
+    Only metadata columns and the BM25 postings are held in memory; chunk text
+    goes straight to disk, so streaming ingestion never keeps the whole
+    document around. With `lexical=False` no BM25 index is written.
+    """
+
+    def __init__(self, path: str, lexical: bool = True):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self._in_place = False
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self._text = open(os.path.join(self.tmp_path, TEXT_FILE), "wb")
+        self._offsets = array("Q", [0])
+        self._columns: Dict[str, list] = {}
+        self._sections: Dict[str, str] = {}
+        self._lexical: Optional[BM25Builder] = BM25Builder() if lexical else None
+        self._count = 0
+
+    @classmethod
+    def resume(cls, path: str, count: int, lexical: bool = True) -> "ChunkStoreWriter":
+        """Reopen an existing store to append more chunks in place.
+
+        `count` is the number of chunks known to be committed; anything past it,
+        left behind by an interrupted append, is discarded first.
+        """
+        writer = cls.__new__(cls)
+        writer.path = path
+        writer.tmp_path = path
+        writer._in_place = True
+
+        writer._offsets = array("Q")
+        with open(os.path.join(path, OFFSETS_FILE), "rb") as f:
+            writer._offsets.frombytes(f.read())
+        del writer._offsets[count + 1:]
+        with open(os.path.join(path, META_FILE)) as f:
+            writer._columns = {key: column[:count] for key, column in json.load(f).items()}
+        with open(os.path.join(path, SECTIONS_FILE)) as f:
+            writer._sections = {
+                chunk_id: name for chunk_id, name in json.load(f).items() if int(chunk_id) < count
+            }
+        writer._lexical = BM25Builder.load(path, count) if lexical else None
+        writer._count = count
+
+        writer._text = open(os.path.join(path, TEXT_FILE), "r+b")
+        writer._text.truncate(writer._offsets[-1])
+        writer._text.seek(writer._offsets[-1])
+        return writer
+
+    def add(self, docs: Iterable[Document]) -> None:
+        for doc in docs:
+            data = doc.page_content.encode("utf-8")
+            self._text.write(data)
+            self._offsets.append(self._offsets[-1] + len(data))
+
+            for key in doc.metadata:
+                if key not in self._columns:
+                    self._columns[key] = [None] * self._count
+            for key, column in self._columns.items():
+                column.append(doc.metadata.get(key))
+
+            if self._lexical is not None:
+                self._lexical.add(doc.page_content)
+            section = detect_section(doc.page_content)
+            if section:
+                self._sections[str(self._count)] = section
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> "ChunkStore":
+        self._text.close()
+        self._write(OFFSETS_FILE, lambda f: self._offsets.tofile(f), "wb")
+        self._write(META_FILE, lambda f: json.dump(self._columns, f), "w")
+        self._write(SECTIONS_FILE, lambda f: json.dump(self._sections, f), "w")
+        if self._lexical is not None:
+            self._lexical.write(self.tmp_path)
+        else:
+            # Postings from before a resume would no longer match the chunks
+            for name in (TERMS_FILE, POSTINGS_FILE, LENGTHS_FILE):
+                if os.path.exists(os.path.join(self.tmp_path, name)):
+                    os.remove(os.path.join(self.tmp_path, name))
+
+        if not self._in_place:
+            # The store only appears under its final name once complete
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(self.tmp_path, self.path)
+        return ChunkStore(self.path)
+
+    def abort(self) -> None:
+        self._text.close()
+        if not self._in_place:
+            shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+    def _write(self, name: str, dump, mode: str) -> None:
+        path = os.path.join(self.tmp_path, name)
+        with open(f"{path}.tmp", mode) as f:
+            dump(f)
+        os.replace(f"{path}.tmp", path)
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of a document's chunks.
+
+    Opening maps the text blob and offsets table without reading them; chunk
+    text is decoded on access and the metadata and section columns are parsed
+    on first use. Behaves like a sequence of Documents whose metadata also
+    carries their `chunk_id`.
+    """
+
+    def __init__(self, path: str, key: Optional[str] = None):
+        self.path = path
+        self.key = key or os.path.basename(path).split(".")[0]
+        self._text = self._map(os.path.join(path, TEXT_FILE))
+        self._offsets_map = self._map(os.path.join(path, OFFSETS_FILE))
+        self._offsets = memoryview(self._offsets_map).cast("Q")
+        self._columns: Optional[Dict[str, list]] = None
+        self._fallback_ids: Optional[List[int]] = None
+        self._sections: Optional[Dict[int, str]] = None
+        self._lexical: Optional[BM25Index] = None
+
+    @staticmethod
+    def write(path: str, docs: Iterable[Document]) -> "ChunkStore":
+        writer = ChunkStoreWriter(path)
+        try:
+            writer.add(docs)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.close()
+
+    @staticmethod
+    def _map(path: str):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return max(len(self._offsets) - 1, 0)
+
+    def text(self, chunk_id: int) -> str:
+        start, end = self._offsets[chunk_id], self._offsets[chunk_id + 1]
+        return bytes(self._text[start:end]).decode("utf-8")
+
+    def metadata(self, chunk_id: int) -> dict:
+        if self._columns is None:
+            with open(os.path.join(self.path, META_FILE)) as f:
+                self._columns = json.load(f)
+        metadata = {
+            key: column[chunk_id]
+            for key, column in self._columns.items()
+            if column[chunk_id] is not None
+        }
+        metadata["chunk_id"] = chunk_id
+        return metadata
+
+    def __getitem__(self, chunk_id: int) -> Document:
+        if chunk_id < 0:
+            chunk_id += len(self)
+        if not 0 <= chunk_id < len(self):
+            raise IndexError(chunk_id)
+        return Document(page_content=self.text(chunk_id), metadata=self.metadata(chunk_id))
+
+    def __iter__(self) -> Iterator[Document]:
+        for chunk_id in range(len(self)):
+            yield self[chunk_id]
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @property
+    def sections(self) -> Dict[int, str]:
+        if self._sections is None:
+            with open(os.path.join(self.path, SECTIONS_FILE)) as f:
+                self._sections = {int(chunk_id): name for chunk_id, name in json.load(f).items()}
+        return self._sections
+
+    @property
+    def lexical(self) -> Optional[BM25Index]:
+        """The store's BM25 index, built and saved on first use for older stores."""
+        if self._lexical is None:
+            try:
+                self._lexical = BM25Index(self.path)
+            except FileNotFoundError:
+                try:
+                    self._lexical = BM25Index.from_texts(
+                        (self.text(chunk_id) for chunk_id in range(len(self))), self.path
+                    )
+                except OSError:
+                    # Read-only store
+                    return None
+        return self._lexical
+
+    def fallback_chunks(self, limit: int) -> List[Document]:
+        if self._fallback_ids is None:
+            self._fallback_ids = sorted(self.sections)
+        return [self[chunk_id] for chunk_id in self._fallback_ids[:limit]]
+
+
+class ChunkDocstore(Docstore):
+    """FAISS docstore that reads documents lazily from a ChunkStore by row id."""
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def search(self, search: str):
+        try:
+            return self.store[int(search)]
+        except (ValueError, IndexError):
+            return f"ID {search} not found."
+
+
+class RowIds(Mapping):
+    """index_to_docstore_id for stores whose FAISS row i is chunk i.
+
+    Answers lookups arithmetically instead of materializing one entry per chunk.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def __getitem__(self, row: int) -> str:
+        if 0 <= row < self.size:
+            return str(row)
+        raise KeyError(row)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.size))
@@ -13,14 +13,134 @@ HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 
 # === Embedding / Vectorstore / Model Settings ===
 VECTORSTORE_BACKEND = os.getenv("VECTORSTORE_BACKEND", "faiss")  # "faiss" or "chroma"
-EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")   # "openai" or "huggingface"
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")   # "openai", "huggingface" or "local"
 LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")                  # "openai", "huggingface", etc.
 
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 800))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
+# Streaming ingestion: parse, split and embed the PDF in windows of chunks
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "True").lower() == "true"
+INGEST_WINDOW_CHUNKS = int(os.getenv("INGEST_WINDOW_CHUNKS", 256))
+INGEST_PREFETCH_WINDOWS = int(os.getenv("INGEST_PREFETCH_WINDOWS", 2))
+# Re-uploaded PDFs reuse the vectors (and trained index) of unchanged chunks
+# from the previous version the same session uploaded under that file name
+INCREMENTAL_UPDATES = os.getenv("INCREMENTAL_UPDATES", "True").lower() == "true"
+# Disk budget for built indexes: least recently used ones are deleted beyond
+# it, but never one used within INDEX_EVICT_IDLE_SECONDS
+INDEX_DISK_MAX_MB = int(os.getenv("INDEX_DISK_MAX_MB", 4096))
+INDEX_EVICT_IDLE_SECONDS = float(os.getenv("INDEX_EVICT_IDLE_SECONDS", 3600))
+
+# Background ingestion jobs started on upload (job table persisted in SQLite)
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", 2))
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "cache/jobs.sqlite3")
+# Uploaded PDFs are stored here under their content digest
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "documents/uploads")
+
+# Multi-process PDF text extraction (1 worker keeps the single-process loader)
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+PDF_PARSE_SHARD_PAGES = int(os.getenv("PDF_PARSE_SHARD_PAGES", 8))
+PDF_PARSE_MIN_PAGES = int(os.getenv("PDF_PARSE_MIN_PAGES", 32))
+
+# FAISS index type: "flat" (exact), "ivf_flat", "ivf_pq" or "hnsw". Trained
+# types learn from the first FAISS_TRAIN_SAMPLE vectors; nprobe / efSearch
+# trade recall for speed at query time.
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", 1024))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", 16))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 16))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", 64))
+FAISS_TRAIN_SAMPLE = int(os.getenv("FAISS_TRAIN_SAMPLE", 50000))
+
+# Vector codec inside the index: "none" (float32), "fp16", "int8" or "pq".
+# Lossy indexes keep the float32 vectors in a memory-mapped file on disk and,
+# with FAISS_EXACT_RERANK, re-rank FAISS_RERANK_FACTOR x k candidates exactly.
+FAISS_QUANTIZATION = os.getenv("FAISS_QUANTIZATION", "none")
+FAISS_EXACT_RERANK = os.getenv("FAISS_EXACT_RERANK", "True").lower() == "true"
+FAISS_RERANK_FACTOR = int(os.getenv("FAISS_RERANK_FACTOR", 4))
+
+# Cross-document library: many papers in a few sharded FAISS indexes
+LIBRARY_DIR = os.getenv("LIBRARY_DIR", "library_dbs")
+LIBRARY_SHARDS = int(os.getenv("LIBRARY_SHARDS", 4))
+# Trained index types learn from the first paper(s) added to each shard
+LIBRARY_INDEX_TYPE = os.getenv("LIBRARY_INDEX_TYPE", "flat")
+LIBRARY_QUANTIZATION = os.getenv("LIBRARY_QUANTIZATION", "none")
+
 K_RETRIEVAL = int(os.getenv("K_RETRIEVAL", 5))
+# Token budget for the context of each QA prompt (0 = unlimited); retrieved
+# chunks are deduplicated and adjacent ones merged before packing
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+
+# Hybrid retrieval: BM25 and vector hits (HYBRID_CANDIDATES each) merged by
+# reciprocal-rank fusion. Keyword-style queries of at most
+# LEXICAL_ONLY_MAX_TERMS terms skip the query embedding and use BM25 alone.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "True").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 20))
+RRF_K = int(os.getenv("RRF_K", 60))
+LEXICAL_ONLY_MAX_TERMS = int(os.getenv("LEXICAL_ONLY_MAX_TERMS", 3))
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+# Optional rerank stage: over-fetch RERANK_CANDIDATES chunks, score them with a
+# local CPU cross-encoder and keep the best RERANK_TOP_K within the time budget
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "False").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", 3))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 16))
+RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", 500))
+RERANK_CACHE_MAX_ENTRIES = int(os.getenv("RERANK_CACHE_MAX_ENTRIES", 20000))
 TEMPERATURE = float(os.getenv("TEMPERATURE", 0.2))
 
+# In-process cache of loaded vectorstores (0 entries disables it)
+VECTORSTORE_CACHE_MAX_ENTRIES = int(os.getenv("VECTORSTORE_CACHE_MAX_ENTRIES", 8))
+VECTORSTORE_CACHE_MAX_MB = int(os.getenv("VECTORSTORE_CACHE_MAX_MB", 1024))
+
+# Embedding pipeline used when building indexes
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", 4))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 5))
+
+# Local CPU embeddings (EMBEDDING_PROVIDER="local"): batch size per forward
+# pass, torch threads (0 keeps torch's default), weight quantization ("none"
+# or "int8") and an optional directory holding pre-downloaded models
+LOCAL_EMBED_MODEL = os.getenv("LOCAL_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBED_BATCH_SIZE = int(os.getenv("LOCAL_EMBED_BATCH_SIZE", 32))
+LOCAL_EMBED_THREADS = int(os.getenv("LOCAL_EMBED_THREADS", 0))
+LOCAL_EMBED_QUANTIZATION = os.getenv("LOCAL_EMBED_QUANTIZATION", "none")
+LOCAL_EMBED_CACHE_DIR = os.getenv("LOCAL_EMBED_CACHE_DIR") or None
+
+# Persistent chunk embedding cache (empty path disables it)
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "cache/embeddings.sqlite3")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", 500000))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 4096))
+
+# Run the fallback chain speculatively alongside the strict one on every
+# question (questions matching IMPORTANT_QUESTION_KEYWORDS skip the strict one)
+SPECULATIVE_FALLBACK = os.getenv("SPECULATIVE_FALLBACK", "False").lower() == "true"
+QA_MAX_WORKERS = int(os.getenv("QA_MAX_WORKERS", 8))
+
+# Batch answering (utils.answer_batch): documents loaded and searched at once
+BATCH_MAX_DOCUMENTS = int(os.getenv("BATCH_MAX_DOCUMENTS", 4))
+
+# Async serving: Gradio queue sizing and in-flight LLM calls per backend
+GRADIO_CONCURRENCY = int(os.getenv("GRADIO_CONCURRENCY", 32))
+GRADIO_MAX_QUEUE_SIZE = int(os.getenv("GRADIO_MAX_QUEUE_SIZE", 128))
+# Build models and clients in the background at startup instead of on the
+# first request (startup itself never waits for them)
+WARM_UP_ON_START = os.getenv("WARM_UP_ON_START", "True").lower() == "true"
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 32))
+LLM_MAX_CONCURRENCY = {
+    "openai": int(os.getenv("OPENAI_MAX_CONCURRENCY", 16)),
+    "huggingface": int(os.getenv("HUGGINGFACE_MAX_CONCURRENCY", 4)),
+}
+
+# Answer cache (ANSWER_CACHE_SIMILARITY > 0 also matches similar questions by
+# query-embedding cosine similarity)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1024))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 24 * 3600))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0))
+
 FALLBACK_SECTIONS = ["introduction", "conclusion"]
 IMPORTANT_QUESTION_KEYWORDS = [
     "findings", "summary", "conclusion", "autism", "hypothesis", "objective"
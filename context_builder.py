@@ -0,0 +1,143 @@
+import threading
+from typing import List, Optional
+
+from langchain.schema.document import Document
+
+from config import CHUNK_OVERLAP, CONTEXT_TOKEN_BUDGET, OPENAI_MODEL
+
+# Rough size of a token in English text, for when no tokenizer is available
+CHARS_PER_TOKEN = 4
+# Don't bother packing a truncated passage shorter than this
+MIN_PASSAGE_TOKENS = 50
+# Shorter suffix/prefix matches between adjacent chunks are taken as
+# coincidence rather than overlap produced by the splitter
+MIN_OVERLAP_CHARS = 8
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken encoding for OPENAI_MODEL, or False if it cannot be loaded."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    try:
+                        _encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+                    except KeyError:
+                        _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    # Not installed, or its BPE file cannot be downloaded
+                    print(f"⚠️ tiktoken unavailable ({type(e).__name__}); estimating token counts")
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+def _overlap(previous: str, text: str, max_chars: int = CHUNK_OVERLAP) -> int:
+    """Length of the splitter overlap `text` starts with, or 0 if there is none.
+
+    That is the longest suffix of `previous` that `text` starts with, provided
+    it is at least MIN_OVERLAP_CHARS long and starts on a word boundary, as the
+    splitter's overlaps always do.
+    """
+    for size in range(min(len(previous), len(text), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:size]) and (size == len(previous) or previous[-size - 1].isspace()):
+            return size
+    return 0
+
+
+def _source(doc: Document):
+    return doc.metadata.get("doc_key", doc.metadata.get("source"))
+
+
+def _passages(docs: List[Document]) -> List[Document]:
+    """Drop duplicate chunks and join runs of adjacent ones into passages.
+
+    Passages come back in the rank of their best chunk; a merged passage reads
+    in document order with the splitter's CHUNK_OVERLAP removed at each seam.
+    Chunks split on different pages never overlap and are joined by a newline.
+    """
+    seen = set()
+    unique = []
+    for doc in docs:
+        if doc.page_content not in seen:
+            seen.add(doc.page_content)
+            unique.append(doc)
+
+    rank = {id(doc): i for i, doc in enumerate(unique)}
+    positioned = sorted(
+        (doc for doc in unique if doc.metadata.get("chunk_id") is not None),
+        key=lambda doc: (str(_source(doc)), doc.metadata["chunk_id"]),
+    )
+    runs = []
+    for doc in positioned:
+        last = runs[-1][-1] if runs else None
+        if (
+            last is not None
+            and _source(last) == _source(doc)
+            and doc.metadata["chunk_id"] == last.metadata["chunk_id"] + 1
+        ):
+            runs[-1].append(doc)
+        else:
+            runs.append([doc])
+    runs.extend([doc] for doc in unique if doc.metadata.get("chunk_id") is None)
+
+    passages = []
+    for run in sorted(runs, key=lambda run: min(rank[id(doc)] for doc in run)):
+        text = run[0].page_content
+        for previous, doc in zip(run, run[1:]):
+            size = 0
+            if previous.metadata.get("page") == doc.metadata.get("page"):
+                size = _overlap(previous.page_content, doc.page_content)
+            text += doc.page_content[size:] if size else "\n" + doc.page_content
+        passages.append(Document(page_content=text, metadata=dict(run[0].metadata)))
+    return passages
+
+
+def pack_documents(docs: List[Document], budget: Optional[int] = CONTEXT_TOKEN_BUDGET) -> List[Document]:
+    """Deduplicated, merged passages from `docs` that fit in `budget` tokens.
+
+    Passages are taken most relevant first; the first one that no longer fits
+    is truncated to the remaining budget and packing stops. The "\\n\\n"
+    separators the stuff prompt puts between passages are counted too.
+    """
+    passages = _passages(docs)
+    if not budget:
+        return passages
+
+    packed = []
+    remaining = budget
+    separator = count_tokens("\n\n")
+    for passage in passages:
+        cost = count_tokens(passage.page_content) + (separator if packed else 0)
+        if cost <= remaining:
+            packed.append(passage)
+            remaining -= cost
+            continue
+        remaining -= separator if packed else 0
+        if remaining >= MIN_PASSAGE_TOKENS or not packed:
+            text = truncate_tokens(passage.page_content, remaining)
+            packed.append(Document(page_content=text, metadata=passage.metadata))
+        break
+    return packed
+
+
+def build_context(docs: List[Document], budget: Optional[int] = CONTEXT_TOKEN_BUDGET) -> str:
+    return "\n\n".join(doc.page_content for doc in pack_documents(docs, budget))
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain.schema.embeddings import Embeddings
+
+from cache import LRUCache
+from config import EMBED_CACHE_MAX_ENTRIES, QUERY_CACHE_MAX_ENTRIES
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """On-disk map of (embedding model, normalized text) -> vector, in SQLite.
+
+    Vectors are stored as float32 blobs. When the table grows past
+    `max_entries`, the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = EMBED_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+            )
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        now = time.time()
+        with self._lock, self._conn:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                        [now, *batch],
+                    )
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._evict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+
+class CachedEmbeddings(Embeddings):
+    """Serves document embeddings from an EmbeddingCache, embedding only misses.
+
+    Query embeddings are kept in a separate in-memory LRU, since repeated
+    questions are common but not worth persisting.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        cache: Optional[EmbeddingCache],
+        model: str,
+        query_cache_entries: int = QUERY_CACHE_MAX_ENTRIES,
+    ):
+        self.base = base
+        self.cache = cache
+        self.model = model
+        self.query_cache = LRUCache(max_entries=query_cache_entries)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None or not texts:
+            return self.base.embed_documents(texts)
+
+        keys = [EmbeddingCache.key(self.model, text) for text in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        cached = sum(key in found for key in keys)
+        print(f"🗃️ Embedding cache: {cached}/{len(texts)} chunks cached")
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_text(text)
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.query_cache.put(key, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries, sending the uncached ones in a single call."""
+        keys = [normalize_text(text) for text in texts]
+        found = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            vector = self.query_cache.get(key)
+            if vector is not None:
+                found[key] = vector
+            elif key not in missing:
+                missing[key] = text
+
+        if missing:
+            texts = list(missing.values())
+            # Never through embed_documents: that is the index-build path,
+            # with its throughput stats and per-call log line
+            batch = getattr(self.base, "embed_queries", None)
+            if len(texts) == 1 or batch is None:
+                vectors = [self.base.embed_query(text) for text in texts]
+            else:
+                vectors = batch(texts)
+            for key, vector in zip(missing, vectors):
+                self.query_cache.put(key, vector)
+                found[key] = vector
+
+        return [found[key] for key in keys]
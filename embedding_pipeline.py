@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from langchain.schema.embeddings import Embeddings
+
+from config import EMBED_BATCH_SIZE, EMBED_MAX_WORKERS, EMBED_MAX_RETRIES
+
+# Exception class names treated as transient provider errors worth retrying
+RETRYABLE_ERRORS = ("RateLimit", "Timeout", "APIConnection", "ServiceUnavailable")
+
+
+def _is_rate_limit(exc: Exception) -> bool:
+    return (
+        "RateLimit" in type(exc).__name__
+        or getattr(exc, "status_code", None) == 429
+        or "rate limit" in str(exc).lower()
+    )
+
+
+def _is_retryable(exc: Exception) -> bool:
+    name = type(exc).__name__
+    return _is_rate_limit(exc) or any(marker in name for marker in RETRYABLE_ERRORS)
+
+
+def _retry_after(exc: Exception) -> float:
+    """Seconds the provider asked us to wait, if it said so."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeds documents in fixed-size batches on a bounded thread pool.
+
+    Wraps any LangChain `Embeddings` (a deterministic fake works for tests).
+    Batches are retried with exponential backoff on rate limits and transient
+    errors; a rate limit on one worker pauses all of them so the pool backs off
+    together instead of hammering the provider. Result order matches input order.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_workers: int = EMBED_MAX_WORKERS,
+        max_retries: int = EMBED_MAX_RETRIES,
+        backoff_seconds: float = 1.0,
+    ):
+        self.base = base
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.last_stats = {}
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        batches = [
+            texts[i:i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        start = time.perf_counter()
+        if self.max_workers == 1 or len(batches) == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                results = list(pool.map(self._embed_batch, batches))
+        elapsed = time.perf_counter() - start
+
+        self.last_stats = {
+            "chunks": len(texts),
+            "batches": len(batches),
+            "seconds": elapsed,
+            "chunks_per_second": len(texts) / elapsed if elapsed else float("inf"),
+        }
+        print(
+            f"⚡ Embedded {len(texts)} chunks in {elapsed:.2f}s "
+            f"({self.last_stats['chunks_per_second']:.1f} chunks/s, {len(batches)} batches)"
+        )
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed a handful of questions in one retried call, leaving
+        `last_stats` (index-build throughput) and the log alone."""
+        if not texts:
+            return []
+        return self._embed_batch(texts)
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self._wait_for_pause()
+            try:
+                return self.base.embed_documents(batch)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt) * (1 + random.random())
+                if _is_rate_limit(e):
+                    delay = max(delay, _retry_after(e))
+                    with self._lock:
+                        self._pause_until = max(self._pause_until, time.monotonic() + delay)
+                print(f"⏳ Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def _wait_for_pause(self) -> None:
+        with self._lock:
+            remaining = self._pause_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
@@ -0,0 +1,225 @@
+from typing import Optional
+
+from config import (
+    FAISS_INDEX_TYPE,
+    FAISS_QUANTIZATION,
+    FAISS_NLIST,
+    FAISS_PQ_M,
+    FAISS_HNSW_M,
+    FAISS_NPROBE,
+    FAISS_EF_SEARCH,
+    FAISS_TRAIN_SAMPLE,
+)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+QUANTIZATIONS = ("none", "fp16", "int8", "pq")
+
+# k-means wants roughly this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+# PQ codebooks have 2^8 centroids per sub-quantizer
+MIN_PQ_TRAIN_POINTS = 256
+
+
+def _quantization(index_type: str, quantization: str) -> str:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported FAISS_INDEX_TYPE: {index_type}")
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unsupported FAISS_QUANTIZATION: {quantization}")
+    # IVF-PQ is IVF with product-quantized codes
+    return "pq" if index_type == "ivf_pq" else quantization
+
+
+def index_settings(index_type: str = FAISS_INDEX_TYPE, quantization: str = FAISS_QUANTIZATION) -> dict:
+    """Build-time settings that change the index's contents (part of its key)."""
+    quantization = _quantization(index_type, quantization)
+    settings = {"index_type": index_type, "quantization": quantization}
+    if index_type.startswith("ivf"):
+        settings["nlist"] = FAISS_NLIST
+    if quantization == "pq":
+        settings["pq_m"] = FAISS_PQ_M
+    if index_type == "hnsw":
+        settings["hnsw_m"] = FAISS_HNSW_M
+    return settings
+
+
+def is_lossy(index_type: str = FAISS_INDEX_TYPE, quantization: str = FAISS_QUANTIZATION) -> bool:
+    """Whether the index stores compressed codes rather than the exact vectors."""
+    return _quantization(index_type, quantization) != "none"
+
+
+def _codec(quantization: str, dim: int, n_train: int) -> str:
+    if quantization == "fp16":
+        return "SQfp16"
+    if quantization == "int8":
+        return "SQ8"
+    if quantization == "pq":
+        if n_train < MIN_PQ_TRAIN_POINTS:
+            # Too few vectors to train PQ codebooks
+            return "SQ8"
+        if dim % FAISS_PQ_M:
+            raise ValueError(f"FAISS_PQ_M={FAISS_PQ_M} must divide the embedding size {dim}")
+        return f"PQ{FAISS_PQ_M}"
+    return "Flat"
+
+
+def factory_string(
+    index_type: str,
+    dim: int,
+    n_train: int,
+    quantization: str = FAISS_QUANTIZATION,
+) -> str:
+    """faiss.index_factory description for an index type and vector codec.
+
+    Small documents cannot train a full IVF/PQ index: nlist shrinks to what
+    the training sample supports, IVF is dropped when even that is too few
+    lists, and PQ falls back to int8 scalar quantization.
+    """
+    codec = _codec(_quantization(index_type, quantization), dim, n_train)
+    if index_type == "hnsw":
+        return f"HNSW{FAISS_HNSW_M}" if codec == "Flat" else f"HNSW{FAISS_HNSW_M}_{codec}"
+    if index_type.startswith("ivf"):
+        nlist = min(FAISS_NLIST, n_train // MIN_POINTS_PER_CENTROID)
+        if nlist >= 2:
+            return f"IVF{nlist},{codec}"
+    return codec
+
+
+def configure_search(index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH):
+    """Apply query-time knobs (nprobe for IVF, efSearch for HNSW) if they apply."""
+    import faiss
+
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            # Not applicable to this index type
+            pass
+    return index
+
+
+def search_params(index, selector):
+    """SearchParameters restricting a search to `selector`, keeping the index's
+    own nprobe / efSearch. The caller must keep `selector` alive while searching.
+    """
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def truncate(index, n: int):
+    """Drop every vector past the first `n`; returns the (possibly new) index.
+
+    HNSW graphs do not support removal, so they are rebuilt from the vectors
+    they store instead.
+    """
+    import faiss
+
+    if index.ntotal <= n:
+        return index
+    try:
+        index.remove_ids(faiss.IDSelectorRange(n, index.ntotal))
+        return index
+    except RuntimeError:
+        kept = index.reconstruct_n(0, n) if n else None
+        rebuilt = faiss.clone_index(index)
+        rebuilt.reset()
+        if n:
+            rebuilt.add(kept)
+        return rebuilt
+
+
+class IndexBuilder:
+    """Builds a FAISS index from vectors that arrive in batches.
+
+    Index types that need training buffer the first `train_size` vectors, train
+    on them, then add everything; flat and HNSW indexes add vectors straight
+    away. Row order always matches the order vectors were added in.
+    """
+
+    def __init__(
+        self,
+        index_type: str = FAISS_INDEX_TYPE,
+        quantization: str = FAISS_QUANTIZATION,
+        train_size: int = FAISS_TRAIN_SAMPLE,
+    ):
+        self.quantization = _quantization(index_type, quantization)
+        self.index_type = index_type
+        self.train_size = train_size
+        self.index = None
+        # index_factory description of the index, once created
+        self.description = None
+        # IVF centroids to reuse instead of training the coarse quantizer
+        self._centroids = None
+        self._pending = []
+        self._pending_count = 0
+
+    @classmethod
+    def from_trained(
+        cls,
+        index,
+        index_type: str = FAISS_INDEX_TYPE,
+        quantization: str = FAISS_QUANTIZATION,
+    ) -> "IndexBuilder":
+        """Builder that reuses the coarse quantizer (IVF centroids) of a trained index.
+
+        Only the centroids carry over, and only if the new index gets the same
+        number of lists; vector codecs (SQ ranges, PQ codebooks) are always
+        trained on the new vectors.
+        """
+        import faiss
+
+        builder = cls(index_type, quantization)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            builder._centroids = ivf.quantizer.reconstruct_n(0, ivf.nlist)
+        return builder
+
+    @property
+    def _needs_training(self) -> bool:
+        return self.index_type.startswith("ivf") or self.quantization in ("int8", "pq")
+
+    def add(self, vectors) -> None:
+        if self.index is not None:
+            self.index.add(vectors)
+            return
+        if not self._needs_training:
+            self._create(vectors.shape[1], len(vectors))
+            self.index.add(vectors)
+            return
+
+        self._pending.append(vectors)
+        self._pending_count += len(vectors)
+        if self._pending_count >= self.train_size:
+            self._train_and_flush()
+
+    def finish(self) -> Optional[object]:
+        if self.index is None and self._pending:
+            self._train_and_flush()
+        return configure_search(self.index) if self.index is not None else None
+
+    def _create(self, dim: int, n_train: int) -> None:
+        import faiss
+
+        self.description = factory_string(self.index_type, dim, n_train, self.quantization)
+        print(f"🧮 Building FAISS index {self.description}")
+        self.index = faiss.index_factory(dim, self.description)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None and self._centroids is not None and len(self._centroids) == ivf.nlist:
+            # A quantizer already holding nlist centroids is not clustered again
+            ivf.quantizer.add(self._centroids)
+
+    def _train_and_flush(self) -> None:
+        import numpy as np
+
+        vectors = np.concatenate(self._pending)
+        self._pending = []
+        self._create(vectors.shape[1], len(vectors))
+        if not self.index.is_trained:
+            self.index.train(vectors[:self.train_size])
+        self.index.add(vectors)
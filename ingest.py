@@ -0,0 +1,175 @@
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Tuple
+
+from langchain.schema.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    INGEST_WINDOW_CHUNKS,
+    INGEST_PREFETCH_WINDOWS,
+    PDF_PARSE_WORKERS,
+    PDF_PARSE_SHARD_PAGES,
+    PDF_PARSE_MIN_PAGES,
+)
+
+_DONE = object()
+
+# worker count -> parse pool, started on first use and shared by every
+# document; workers are spawned, since forking a server that already runs
+# ingest, event-loop and Gradio threads can deadlock the child
+_parse_pools: Dict[int, ProcessPoolExecutor] = {}
+_parse_pools_lock = threading.Lock()
+
+
+def get_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+
+
+def _parse_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    # Runs in a worker process: open the file independently and extract a shard
+    import pypdf
+
+    reader = pypdf.PdfReader(pdf_path)
+    return [(number, reader.pages[number].extract_text()) for number in range(start, end)]
+
+
+def page_count(pdf_path: str) -> int:
+    import pypdf
+
+    return len(pypdf.PdfReader(pdf_path).pages)
+
+
+def _parse_pool(workers: int) -> ProcessPoolExecutor:
+    with _parse_pools_lock:
+        pool = _parse_pools.get(workers)
+        if pool is None:
+            pool = _parse_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+    return pool
+
+
+def _discard_parse_pool(workers: int, pool: ProcessPoolExecutor) -> None:
+    # A worker died: the pool refuses new work, so the next document starts a new one
+    with _parse_pools_lock:
+        if _parse_pools.get(workers) is pool:
+            del _parse_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pages_parallel(
+    pdf_path: str,
+    workers: int = PDF_PARSE_WORKERS,
+    shard_pages: int = PDF_PARSE_SHARD_PAGES,
+) -> Iterator[Document]:
+    """Extract page text on a process pool, yielding pages in document order.
+
+    The PDF is cut into page ranges of `shard_pages`; only a few shards per
+    worker are in flight at once so memory stays bounded on very long files.
+    The worker pool is started once and reused by later documents.
+    Pages carry the same text and metadata as PyPDFLoader produces.
+    """
+    total = page_count(pdf_path)
+    shards = deque(
+        (start, min(start + shard_pages, total))
+        for start in range(0, total, shard_pages)
+    )
+    pool = _parse_pool(workers)
+    in_flight = deque()
+    try:
+        while shards or in_flight:
+            while shards and len(in_flight) < workers * 2:
+                start, end = shards.popleft()
+                in_flight.append(pool.submit(_parse_page_range, pdf_path, start, end))
+            for number, text in in_flight.popleft().result():
+                yield Document(page_content=text, metadata={"source": pdf_path, "page": number})
+    except BrokenProcessPool:
+        _discard_parse_pool(workers, pool)
+        raise
+    finally:
+        # The pool outlives this document: drop its queued shards if we stop early
+        for future in in_flight:
+            future.cancel()
+
+
+def iter_pages(pdf_path: str) -> Iterator[Document]:
+    """Yield one Document per PDF page without materializing the whole file."""
+    if PDF_PARSE_WORKERS > 1 and page_count(pdf_path) >= PDF_PARSE_MIN_PAGES:
+        yield from iter_pages_parallel(pdf_path)
+    else:
+        from langchain.document_loaders import PyPDFLoader
+
+        yield from PyPDFLoader(pdf_path).lazy_load()
+
+
+def iter_chunks(pdf_path: str) -> Iterator[Document]:
+    # Pages are split independently, exactly as split_documents does for a list
+    splitter = get_splitter()
+    for page in iter_pages(pdf_path):
+        yield from splitter.split_documents([page])
+
+
+def load_chunks(pdf_path: str) -> List[Document]:
+    """Parse and split the whole PDF in one go."""
+    return get_splitter().split_documents(list(iter_pages(pdf_path)))
+
+
+def iter_chunk_windows(
+    pdf_path: str,
+    window_size: int = INGEST_WINDOW_CHUNKS,
+    prefetch: int = INGEST_PREFETCH_WINDOWS,
+) -> Iterator[List[Document]]:
+    """Yield lists of up to `window_size` chunks, parsed on a background thread.
+
+    At most `prefetch` windows are buffered ahead of the consumer, so parsing of
+    later pages overlaps with embedding of earlier ones while memory stays
+    bounded by a few windows rather than the whole document.
+    """
+    windows: "queue.Queue" = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            window = []
+            for chunk in iter_chunks(pdf_path):
+                window.append(chunk)
+                if len(window) >= window_size:
+                    windows.put(window)
+                    window = []
+                if stop.is_set():
+                    return
+            if window:
+                windows.put(window)
+        except Exception as e:
+            windows.put(e)
+        finally:
+            windows.put(_DONE)
+
+    producer = threading.Thread(target=produce, name="pdf-ingest", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = windows.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Unblock the producer if it is waiting on a full queue
+        while producer.is_alive():
+            try:
+                windows.get(timeout=0.1)
+            except queue.Empty:
+                pass
@@ -0,0 +1,186 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from typing import Dict, Optional
+
+from config import INGEST_JOB_WORKERS, JOBS_DB_PATH, UPLOAD_DIR
+from loader import file_digest, index_key, is_indexed, load_vectorstore, sweep_indexes
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class IngestionQueue:
+    """Builds document indexes on a background thread pool.
+
+    Jobs are identified by the document's index key, so re-submitting the same
+    content joins a queued or running job. Their status and progress live in
+    a SQLite table; jobs a previous process left queued or running are
+    re-submitted on startup (the interrupted build simply starts over).
+    Finished jobs keep only their status: results are fetched through
+    load_vectorstore, whose cache bounds what stays in memory.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH, max_workers: int = INGEST_JOB_WORKERS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, pdf_name TEXT NOT NULL, status TEXT NOT NULL,"
+                " progress REAL NOT NULL, message TEXT, error TEXT, updated_at REAL NOT NULL,"
+                " pdf_path TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "pdf_path" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN pdf_path TEXT")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._futures: Dict[str, Future] = {}
+
+        with self._lock:
+            interrupted = self._conn.execute(
+                "SELECT id, pdf_name, pdf_path FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+        for job_id, pdf_name, pdf_path in interrupted:
+            pdf_path = pdf_path or f"documents/{pdf_name}"
+            if os.path.exists(pdf_path):
+                self.submit(pdf_name, pdf_path)
+            else:
+                self._update(job_id, status=FAILED, error="Document no longer exists")
+        # Make room from indexes left unused while we were down
+        sweep_indexes()
+
+    def submit(self, pdf_name: str, pdf_path: Optional[str] = None, owner: Optional[str] = None) -> str:
+        """Queue indexing of documents/<pdf_name>, or of the PDF at `pdf_path`
+        that `owner` (e.g. an app session) uploaded under that name; returns
+        the job id.
+        """
+        pdf_path = pdf_path or f"documents/{pdf_name}"
+        job_id = index_key(pdf_path)
+        with self._lock:
+            if job_id in self._futures:
+                # Already queued or running
+                return job_id
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row[0] == DONE and is_indexed(job_id):
+                # Already indexed: asking again about it must not wait on a worker
+                return job_id
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs"
+                    " (id, pdf_name, pdf_path, status, progress, message, error, updated_at)"
+                    " VALUES (?, ?, ?, ?, 0, 'Waiting for a worker', NULL, ?)",
+                    (job_id, pdf_name, pdf_path, QUEUED, time.time()),
+                )
+            future = self._futures[job_id] = self._executor.submit(self._run, job_id, pdf_name, pdf_path, owner)
+        future.add_done_callback(lambda _: self._forget(job_id, future))
+        print(f"🗂️ Queued ingestion of {pdf_name} ({job_id})")
+        return job_id
+
+    def _forget(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+
+    def _run(self, job_id: str, pdf_name: str, pdf_path: str, owner: Optional[str]) -> None:
+        self._update(job_id, status=RUNNING, message="Parsing PDF")
+        try:
+            if index_key(pdf_path) != job_id:
+                raise RuntimeError(f"{pdf_name} changed after it was queued; upload it again")
+            _, chunks = load_vectorstore(
+                pdf_name,
+                progress=lambda fraction, message: self._update(job_id, progress=fraction, message=message),
+                pdf_path=pdf_path,
+                owner=owner,
+            )
+        except BaseException as e:
+            self._update(job_id, status=FAILED, error=str(e), message="Indexing failed")
+            raise
+        self._update(job_id, status=DONE, progress=1.0, message=f"Indexed {len(chunks)} chunks")
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?",
+                [*fields.values(), time.time(), job_id],
+            )
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pdf_name, pdf_path, status, progress, message, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("pdf_name", "pdf_path", "status", "progress", "message", "error"), row))
+
+    def wait_done(self, job_id: str, timeout: Optional[float] = None) -> bool:
+        """Block up to `timeout` seconds for the job to finish; True once it has."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is None:
+            return True
+        wait_futures([future], timeout)
+        return future.done()
+
+    def wait(
+        self,
+        job_id: str,
+        timeout: Optional[float] = None,
+        pdf_name: Optional[str] = None,
+        owner: Optional[str] = None,
+    ):
+        """Block until the job finishes; returns (vectorstore, chunks) or raises its error.
+
+        `pdf_name` and `owner` say who asks: another session may have uploaded
+        the same content under a different name.
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+        status = self.status(job_id)
+        if status is None:
+            raise KeyError(f"Unknown ingestion job {job_id}")
+        if status["status"] == FAILED:
+            raise RuntimeError(status["error"])
+        # Cached, or rebuilt if the index went unused and was deleted since
+        return load_vectorstore(pdf_name or status["pdf_name"], pdf_path=status["pdf_path"], owner=owner)
+
+
+def save_upload(upload_path: str) -> str:
+    """Store an uploaded file in UPLOAD_DIR under its content digest; returns its path.
+
+    Stored uploads never change, so two users uploading different files with
+    the same name cannot overwrite each other's document before it is indexed.
+    """
+    path = os.path.join(UPLOAD_DIR, f"{file_digest(upload_path)}.pdf")
+    if not os.path.exists(path):
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        shutil.copyfile(upload_path, tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+_queue: Optional[IngestionQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = IngestionQueue()
+        return _queue
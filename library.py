@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain.schema.document import Document
+
+from chunk_store import ChunkStore, ChunkStoreWriter
+from config import (
+    K_RETRIEVAL,
+    LIBRARY_DIR,
+    LIBRARY_SHARDS,
+    LIBRARY_INDEX_TYPE,
+    LIBRARY_QUANTIZATION,
+)
+from faiss_index import IndexBuilder, configure_search, search_params, truncate
+from ingest import iter_chunk_windows
+from loader import document_key, get_embeddings
+
+MANIFEST_FILE = "manifest.json"
+
+
+class Shard:
+    """One FAISS index plus chunk store holding many documents back to back.
+
+    The manifest maps each document key to its [start, end) row range; it is
+    written last, so rows past the manifest's total belong to an interrupted
+    add and are discarded on the next one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.index = None
+        self.store: Optional[ChunkStore] = None
+        self.documents: Dict[str, dict] = {}
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.documents = json.load(f)
+            self._open()
+
+    @property
+    def size(self) -> int:
+        return max((doc["end"] for doc in self.documents.values()), default=0)
+
+    def _open(self) -> None:
+        import faiss
+
+        index = faiss.read_index(os.path.join(self.path, "index.faiss"))
+        self.index = configure_search(truncate(index, self.size))
+        self.store = ChunkStore(os.path.join(self.path, "chunks"))
+
+    def add_documents(self, documents: List[Tuple[str, str, Iterable[List[Document]]]]) -> None:
+        """Append (doc key, name, chunk windows) documents and commit them once.
+
+        Committing rewrites the index file and the store's metadata, so a
+        batch pays for that once instead of once per paper. Either every
+        document of the batch is added or, on error, none is.
+        """
+        import faiss
+        import numpy as np
+
+        if not documents:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        chunks_path = os.path.join(self.path, "chunks")
+        start = self.size
+        builder = IndexBuilder(LIBRARY_INDEX_TYPE, LIBRARY_QUANTIZATION) if self.index is None else None
+        # Library search is vector only, so shards skip the BM25 postings
+        if self.store is not None:
+            writer = ChunkStoreWriter.resume(chunks_path, start, lexical=False)
+        else:
+            writer = ChunkStoreWriter(chunks_path, lexical=False)
+
+        added = {}
+        try:
+            for doc_key, name, windows in documents:
+                doc_start = len(writer)
+                for window in windows:
+                    for doc in window:
+                        doc.metadata["doc_key"] = doc_key
+                        doc.metadata["doc_name"] = name
+                    vectors = np.asarray(
+                        get_embeddings().embed_documents([doc.page_content for doc in window]),
+                        dtype="float32",
+                    )
+                    if builder is not None:
+                        builder.add(vectors)
+                    else:
+                        self.index.add(vectors)
+                    writer.add(window)
+                added[doc_key] = {"name": name, "start": doc_start, "end": len(writer)}
+            if builder is not None:
+                self.index = builder.finish()
+        except BaseException:
+            writer.abort()
+            if self.index is not None:
+                self.index = configure_search(truncate(self.index, start))
+            raise
+
+        self.store = writer.close()
+        tmp_path = os.path.join(self.path, "index.faiss.tmp")
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, "index.faiss"))
+
+        self.documents.update(added)
+        tmp_path = os.path.join(self.path, f"{MANIFEST_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.documents, f)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+
+    def search(self, vector, k: int, doc_keys: Optional[set] = None) -> List[Tuple[float, Document]]:
+        import faiss
+        import numpy as np
+
+        if self.index is None or not self.size:
+            return []
+
+        params = selector = None
+        if doc_keys is not None:
+            ranges = [
+                np.arange(doc["start"], doc["end"], dtype="int64")
+                for key, doc in self.documents.items() if key in doc_keys
+            ]
+            if not ranges:
+                return []
+            selector = faiss.IDSelectorBatch(np.concatenate(ranges))
+            params = search_params(self.index, selector)
+
+        query = np.asarray([vector], dtype="float32")
+        distances, rows = self.index.search(query, k, params=params)
+        return [
+            (float(distance), self.store[int(row)])
+            for distance, row in zip(distances[0], rows[0])
+            if 0 <= row < self.size
+        ]
+
+
+class Library:
+    """Many papers in a fixed number of sharded FAISS indexes.
+
+    Documents are assigned to a shard by their content key, so memory and
+    startup scale with the number of shards rather than the number of papers.
+    Shards are opened lazily on first use.
+    """
+
+    def __init__(self, root: str = LIBRARY_DIR, num_shards: int = LIBRARY_SHARDS):
+        self.root = root
+        self.num_shards = num_shards
+        self._shards: Dict[int, Shard] = {}
+        self._lock = threading.Lock()
+
+    def _shard_id(self, doc_key: str) -> int:
+        return int(hashlib.sha256(doc_key.encode()).hexdigest(), 16) % self.num_shards
+
+    def _shard(self, shard_id: int) -> Shard:
+        with self._lock:
+            if shard_id not in self._shards:
+                self._shards[shard_id] = Shard(os.path.join(self.root, f"shard_{shard_id:03d}"))
+            return self._shards[shard_id]
+
+    def documents(self) -> Dict[str, str]:
+        """Document key -> name for every paper in the library."""
+        return {
+            key: doc["name"]
+            for shard_id in range(self.num_shards)
+            for key, doc in self._shard(shard_id).documents.items()
+        }
+
+    def add_document(self, pdf_path: str, name: Optional[str] = None) -> str:
+        """Index a PDF into its shard (no-op if already present); returns its key."""
+        return self.add_documents([pdf_path], [name] if name else None)[0]
+
+    def add_documents(self, pdf_paths: List[str], names: Optional[List[str]] = None) -> List[str]:
+        """Index many PDFs, committing each shard once; returns their keys.
+
+        Papers already in the library (or repeated in `pdf_paths`) are skipped.
+        """
+        names = names or [os.path.basename(path) for path in pdf_paths]
+        # Not index_key: the per-document index settings must not re-add a paper
+        keys = [document_key(path) for path in pdf_paths]
+        by_shard: Dict[int, Dict[str, Tuple[str, str]]] = {}
+        for key, path, name in zip(keys, pdf_paths, names):
+            by_shard.setdefault(self._shard_id(key), {}).setdefault(key, (path, name))
+
+        for shard_id, documents in sorted(by_shard.items()):
+            shard = self._shard(shard_id)
+            with shard.lock:
+                new = [
+                    (key, name, iter_chunk_windows(path))
+                    for key, (path, name) in documents.items()
+                    if key not in shard.documents
+                ]
+                for key, name, _ in new:
+                    print(f"📚 Adding {name} to library ({key})")
+                shard.add_documents(new)
+        return keys
+
+    def search(
+        self,
+        query: str,
+        k: int = K_RETRIEVAL,
+        doc_keys: Optional[Iterable[str]] = None,
+    ) -> List[Document]:
+        """Top-k chunks across the library, optionally limited to some documents."""
+        vector = get_embeddings().embed_query(query)
+        if doc_keys is not None:
+            doc_keys = set(doc_keys)
+            shard_ids = {self._shard_id(key) for key in doc_keys}
+        else:
+            shard_ids = range(self.num_shards)
+
+        hits = []
+        for shard_id in shard_ids:
+            shard = self._shard(shard_id)
+            with shard.lock:
+                hits.extend(shard.search(vector, k, doc_keys))
+        hits.sort(key=lambda hit: hit[0])
+        return [doc for _, doc in hits[:k]]
+
+
+def main():
+    """Library mode from the command line: index papers, then ask across all
+    of them (or a few, by file name) instead of one uploaded PDF.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ask questions across a library of papers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="index PDFs into the library")
+    add.add_argument("pdfs", nargs="+")
+    ask = commands.add_parser("ask", help="answer a question from the library")
+    ask.add_argument("question")
+    ask.add_argument("--paper", action="append", help="limit to papers with this file name")
+    ask.add_argument("--backend", help="LLM backend (default LLM_BACKEND)")
+    commands.add_parser("list", help="list the papers in the library")
+    args = parser.parse_args()
+
+    library = Library()
+    if args.command == "add":
+        library.add_documents(args.pdfs)
+    elif args.command == "list":
+        for key, name in sorted(library.documents().items(), key=lambda item: item[1]):
+            print(f"{name}  ({key})")
+    else:
+        from utils import get_library_answer
+
+        doc_keys = None
+        if args.paper:
+            doc_keys = [key for key, name in library.documents().items() if name in args.paper]
+            if not doc_keys:
+                parser.error(f"no paper named {', '.join(args.paper)} in the library")
+        print(get_library_answer(args.question, library, doc_keys=doc_keys, backend=args.backend))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,158 @@
+import asyncio
+import threading
+import weakref
+
 from config import (
     LLM_BACKEND,
+    LLM_MAX_CONCURRENCY,
+    LLM_HTTP_MAX_CONNECTIONS,
     OPENAI_MODEL,
     HF_MODEL,
     HUGGINGFACEHUB_API_TOKEN,
     TEMPERATURE
 )
 
-from langchain.chat_models import ChatOpenAI
-from langchain.llms import HuggingFaceHub
+BACKENDS = ("openai", "huggingface")
+
+
+def _model(backend):
+    if backend == "openai":
+        return OPENAI_MODEL
+    if backend == "huggingface":
+        return HF_MODEL
+    raise ValueError(f"Unsupported LLM_BACKEND: {backend}")
+
+
+def get_model_name(backend=None):
+    """Identifies the backend and model answering questions, e.g. for caching."""
+    backend = backend or LLM_BACKEND
+    return f"{backend}:{_model(backend)}"
+
+
+# event loop -> {backend: semaphore bounding its in-flight async calls}
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def llm_slot(backend=None):
+    """Async context manager holding one of the backend's LLM_MAX_CONCURRENCY slots."""
+    backend = backend or LLM_BACKEND
+    per_backend = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    if backend not in per_backend:
+        per_backend[backend] = asyncio.Semaphore(LLM_MAX_CONCURRENCY.get(backend, 4))
+    return per_backend[backend]
+
+
+# (backend, model, temperature) -> LLM client, built on first use and reused
+# by every request, so model switching costs no client setup or TLS handshake
+_clients = {}
+_clients_lock = threading.Lock()
+# OpenAI client settings -> sync chat completions over pooled connections,
+# shared by all OpenAI models and temperatures
+_openai_completions = {}
+# event loop -> {client settings: async chat completions}: an
+# httpx.AsyncClient's connections belong to the loop that opened them, so each
+# loop (e.g. every asyncio.run in utils.answer_batch) gets its own pool
+_openai_async_completions = weakref.WeakKeyDictionary()
+_completions_lock = threading.Lock()
+
+
+def _http_limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+    )
 
 
-def get_llm(temperature=TEMPERATURE):
-    if LLM_BACKEND == "openai":
-        return ChatOpenAI(
+def _client_params(llm):
+    """The OpenAI client settings ChatOpenAI resolved from its fields and the
+    environment (OPENAI_API_BASE, organization, timeout, retries, headers),
+    as its validate_environment passes them, minus the http_client.
+    """
+    return {
+        "api_key": llm.openai_api_key,
+        "organization": llm.openai_organization,
+        "base_url": llm.openai_api_base,
+        "timeout": llm.request_timeout,
+        "max_retries": llm.max_retries,
+        "default_headers": llm.default_headers,
+        "default_query": llm.default_query,
+    }
+
+
+def _pooled_completions(params, proxy, is_async):
+    import httpx
+    import openai
+
+    key = repr((sorted(params.items()), proxy))
+    with _completions_lock:
+        if is_async:
+            pool = _openai_async_completions.setdefault(asyncio.get_running_loop(), {})
+        else:
+            pool = _openai_completions
+        completions = pool.get(key)
+        if completions is None:
+            if is_async:
+                http_client = httpx.AsyncClient(limits=_http_limits(), proxy=proxy or None)
+                client = openai.AsyncOpenAI(**params, http_client=http_client)
+            else:
+                http_client = httpx.Client(limits=_http_limits(), proxy=proxy or None)
+                client = openai.OpenAI(**params, http_client=http_client)
+            completions = pool[key] = client.chat.completions
+    return completions
+
+
+class _PooledCompletions:
+    """Chat completions over a shared connection pool, resolved on every call
+    from the owning ChatOpenAI's client settings; the async side is looked up
+    per running event loop, so one pooled LLM works from any loop.
+    """
+
+    def __init__(self, is_async):
+        self.is_async = is_async
+        self.llm = None
+
+    def __getattr__(self, name):
+        completions = _pooled_completions(
+            _client_params(self.llm), self.llm.openai_proxy, self.is_async
+        )
+        return getattr(completions, name)
+
+
+def _create_llm(backend, temperature):
+    if backend == "openai":
+        from langchain.chat_models import ChatOpenAI
+
+        # Passing both clients keeps ChatOpenAI from opening its own; they
+        # use its settings once validation has resolved them
+        client, async_client = _PooledCompletions(False), _PooledCompletions(True)
+        llm = ChatOpenAI(
             model=OPENAI_MODEL,
-            temperature=temperature
+            temperature=temperature,
+            client=client,
+            async_client=async_client,
         )
-    elif LLM_BACKEND == "huggingface":
+        client.llm = async_client.llm = llm
+        return llm
+    elif backend == "huggingface":
+        from langchain.llms import HuggingFaceHub
+
         return HuggingFaceHub(
             repo_id=HF_MODEL,
             model_kwargs={"temperature": temperature, "max_new_tokens": 512},
             huggingfacehub_api_token=HUGGINGFACEHUB_API_TOKEN
         )
     else:
-        raise ValueError(f"Unsupported LLM_BACKEND: {LLM_BACKEND}")
+        raise ValueError(f"Unsupported LLM_BACKEND: {backend}")
+
+
+def get_llm(temperature=TEMPERATURE, backend=None):
+    """Pooled LLM client for a backend (default LLM_BACKEND) and temperature."""
+    backend = backend or LLM_BACKEND
+    key = (backend, _model(backend), temperature)
+    with _clients_lock:
+        llm = _clients.get(key)
+        if llm is None:
+            llm = _clients[key] = _create_llm(backend, temperature)
+    return llm
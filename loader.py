@@ -1,12 +1,31 @@
+import asyncio
+import functools
+import hashlib
+import json
 import os
-import pickle
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import PyPDFLoader
+import shutil
+import threading
+import time
+from cache import LRUCache
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from embedding_pipeline import BatchedEmbeddings
+from faiss_index import IndexBuilder, configure_search, index_settings, is_lossy
+from chunk_store import ChunkDocstore, ChunkStore, ChunkStoreWriter, RowIds
+from ingest import page_count, iter_chunk_windows, load_chunks
 from config import (
     CHUNK_SIZE,
     CHUNK_OVERLAP,
     EMBEDDING_PROVIDER,
+    EMBED_CACHE_PATH,
+    EMBED_MAX_WORKERS,
+    FAISS_EXACT_RERANK,
+    INCREMENTAL_UPDATES,
+    INDEX_DISK_MAX_MB,
+    INDEX_EVICT_IDLE_SECONDS,
+    INGEST_STREAMING,
     VECTORSTORE_BACKEND,
+    VECTORSTORE_CACHE_MAX_ENTRIES,
+    VECTORSTORE_CACHE_MAX_MB,
     USE_HF_SECRETS,
 )
 
@@ -15,71 +34,656 @@ if not USE_HF_SECRETS:
     from dotenv import load_dotenv
     load_dotenv()
 
-# Load embedding model
-if EMBEDDING_PROVIDER == "openai":
-    from langchain.embeddings import OpenAIEmbeddings
-    embeddings = OpenAIEmbeddings()
-elif EMBEDDING_PROVIDER == "huggingface":
-    from langchain.embeddings import HuggingFaceEmbeddings
-    embeddings = HuggingFaceEmbeddings()
-else:
-    raise ValueError(f"Unsupported EMBEDDING_PROVIDER: {EMBEDDING_PROVIDER}")
+def _embeddings_class():
+    if EMBEDDING_PROVIDER == "openai":
+        from langchain.embeddings import OpenAIEmbeddings
+        return OpenAIEmbeddings
+    elif EMBEDDING_PROVIDER == "huggingface":
+        from langchain.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings
+    elif EMBEDDING_PROVIDER == "local":
+        from local_embeddings import LocalEmbeddings
+        return LocalEmbeddings
+    else:
+        raise ValueError(f"Unsupported EMBEDDING_PROVIDER: {EMBEDDING_PROVIDER}")
 
-# Load vectorstore (FAISS or Chroma)
-def load_vectorstore(pdf_name):
-    pdf_path = f"documents/{pdf_name}"
-    base_name = os.path.splitext(pdf_name)[0]
 
-    if VECTORSTORE_BACKEND == "chroma":
-        from langchain.vectorstores import Chroma
-        db_dir = f"chroma_dbs/{base_name}"
-        if os.path.exists(db_dir) and os.listdir(db_dir):
-            print(f"📦 Loading Chroma vectorstore for {pdf_name}")
-            vectorstore = Chroma(persist_directory=db_dir, embedding_function=embeddings)
-            return vectorstore, None
-
-    elif VECTORSTORE_BACKEND == "faiss":
-        from langchain.vectorstores import FAISS
-        db_path = f"faiss_dbs/{base_name}"
-        index_path = f"{db_path}.pkl"
-
-        if os.path.exists(f"{db_path}.faiss") and os.path.exists(index_path):
-            print(f"📦 Loading FAISS vectorstore for {pdf_name}")
-            with open(index_path, "rb") as f:
-                docs = pickle.load(f)
-            vectorstore = FAISS.load_local(db_path, embeddings, allow_dangerous_deserialization=True)
-            return vectorstore, None
+@functools.lru_cache(maxsize=None)
+def embedding_id():
+    """Identifies the configured embeddings as "<provider>:<model>", read from
+    the class defaults so that computing index keys never loads the model.
+    """
+    if EMBEDDING_PROVIDER == "local":
+        from local_embeddings import model_id
+        return f"local:{model_id()}"
+    cls = _embeddings_class()
+    fields = getattr(cls, "__fields__", {})
+    model = next(
+        (fields[name].default for name in ("model", "model_name") if name in fields),
+        None,
+    )
+    return f"{EMBEDDING_PROVIDER}:{model or cls.__name__}"
+
+
+# Embedding model, created on first use: instantiating it imports the provider
+# SDK and, for HuggingFace, loads a sentence-transformers model
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings():
+    """The shared embeddings: index builds look chunks up in the persistent
+    embedding cache, then embed the misses in concurrent batches (a local
+    model embeds one batch at a time, using all its threads).
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                workers = 1 if EMBEDDING_PROVIDER == "local" else EMBED_MAX_WORKERS
+                _embeddings = CachedEmbeddings(
+                    BatchedEmbeddings(_embeddings_class()(), max_workers=workers),
+                    EmbeddingCache(EMBED_CACHE_PATH) if EMBED_CACHE_PATH else None,
+                    model=embedding_id(),
+                )
+    return _embeddings
+
+
+# Bump when the on-disk index layout changes so old indexes are rebuilt
+INDEX_FORMAT_VERSION = 3
+
+# Content digests of PDFs, keyed by (path, mtime, size) so unchanged files are
+# hashed only once per process
+_digest_cache = LRUCache(max_entries=1024)
+
+def file_digest(path):
+    """SHA-256 of a file's bytes."""
+    st = os.stat(path)
+    stat_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    digest = _digest_cache.get(stat_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        _digest_cache.put(stat_key, digest)
+    return digest
+
+
+def _content_key(pdf_path, settings):
+    sha = hashlib.sha256(file_digest(pdf_path).encode())
+    sha.update(json.dumps(settings, sort_keys=True).encode())
+    return sha.hexdigest()[:32]
+
+
+def _chunk_settings():
+    """Settings that change a PDF's chunks or their vectors."""
+    return {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_provider": EMBEDDING_PROVIDER,
+        "embedding_model": embedding_id().split(":", 1)[1],
+    }
+
+
+def document_key(pdf_path):
+    """Content address of a PDF's chunks and vectors, whatever index holds them."""
+    return _content_key(pdf_path, _chunk_settings())
+
+
+def index_key(pdf_path):
+    """Content address of the index built from a PDF.
+
+    Hashes the PDF bytes together with every setting that changes the resulting
+    chunks, vectors or index, so identical uploads share one index whatever
+    their file name, and a changed file or setting never reuses a stale one.
+    """
+    settings = {"format": INDEX_FORMAT_VERSION, **_chunk_settings()}
+    if VECTORSTORE_BACKEND == "faiss":
+        settings.update(index_settings())
+    return _content_key(pdf_path, settings)
+
+
+def _db_root():
+    return "chroma_dbs" if VECTORSTORE_BACKEND == "chroma" else "faiss_dbs"
+
+
+def _chunks_path(index_name):
+    return f"{_db_root()}/{index_name}.chunks"
+
+
+def is_indexed(index_name):
+    """Whether a complete index `index_name` is on disk."""
+    # The chunk store is written last, so its presence marks a complete index
+    return os.path.isdir(_chunks_path(index_name))
+
+
+# Version lineage: the index built from the latest upload of a file name, so a
+# re-uploaded PDF can be updated incrementally from the previous version. Names
+# are scoped by owner (an app session): unrelated users may upload different
+# files under the same name, so a session only ever updates from its own
+# uploads. Session lineage lives in memory, as sessions do not outlive the
+# process; without an owner only documents/<name> has versions, kept on disk.
+SESSION_LINEAGE_MAX_ENTRIES = 4096
+_session_lineage = LRUCache(max_entries=SESSION_LINEAGE_MAX_ENTRIES)
+_lineage_lock = threading.Lock()
+
+
+def _lineage_path():
+    return f"{_db_root()}/lineage.json"
+
+
+def _read_lineage():
+    try:
+        with open(_lineage_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
+
+def _has_versions(pdf_name, pdf_path, owner):
+    return owner is not None or pdf_path == f"documents/{pdf_name}"
+
+
+def _record_lineage(pdf_name, pdf_path, index_name, owner=None):
+    """Note that the latest upload of `pdf_name` by `owner` is `index_name`."""
+    if not _has_versions(pdf_name, pdf_path, owner):
+        return
+    entry = {"key": index_name, "embedding_model": embedding_id()}
+    if VECTORSTORE_BACKEND == "faiss":
+        entry["index"] = index_settings()
+    if owner is not None:
+        _session_lineage.put((owner, pdf_name), entry)
+        return
+    with _lineage_lock:
+        lineage = _read_lineage()
+        if lineage.get(pdf_name) != entry:
+            lineage[pdf_name] = entry
+            tmp_path = _lineage_path() + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(lineage, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, _lineage_path())
+
+
+def _previous_version(pdf_name, pdf_path, index_name, owner=None):
+    """Lineage entry of an earlier upload of `pdf_name` by `owner` whose chunk
+    vectors can be reused, or None.
+    """
+    if not INCREMENTAL_UPDATES or not _has_versions(pdf_name, pdf_path, owner):
+        return None
+    if owner is not None:
+        entry = _session_lineage.get((owner, pdf_name))
     else:
-        raise ValueError(f"Unsupported VECTORSTORE_BACKEND: {VECTORSTORE_BACKEND}")
+        entry = _read_lineage().get(pdf_name)
+    if not entry or entry["key"] == index_name:
+        return None
+    if entry.get("embedding_model") != embedding_id():
+        return None
+    if not is_indexed(entry["key"]):
+        return None
+    return entry
 
-    # Create vectorstore if none exists
-    print(f"📄 Creating vectorstore for {pdf_name}")
-    loader = PyPDFLoader(pdf_path)
-    raw_docs = loader.load()
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
+# Index -> when it was last used (built, loaded or served from cache), by any
+# process. Disk space is reclaimed least recently used first, from indexes no
+# request has touched for a while, however many names or sessions point at
+# them: open chunk stores read their files lazily, so anything in use must stay.
+USAGE_RECORD_SECONDS = 60
+_usage_lock = threading.Lock()
+# index -> when this process last wrote a use of it to disk
+_usage_recorded = {}
+
+
+def _usage_path():
+    return f"{_db_root()}/usage.json"
+
+
+def _read_usage():
+    try:
+        with open(_usage_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_usage(usage):
+    tmp_path = f"{_usage_path()}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(usage, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, _usage_path())
+
+
+def _record_use(index_name):
+    # At most once a minute per index: cache hits are recorded too
+    now = time.time()
+    if now - _usage_recorded.get(index_name, 0) < USAGE_RECORD_SECONDS:
+        return
+    with _usage_lock:
+        _usage_recorded[index_name] = now
+        usage = _read_usage()
+        usage[index_name] = now
+        _write_usage(usage)
+
+
+def _index_bytes(index_name):
+    total = 0
+    for path in _index_files(index_name):
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+
+def sweep_indexes(max_bytes=INDEX_DISK_MAX_MB * 1024 * 1024, min_idle_seconds=INDEX_EVICT_IDLE_SECONDS):
+    """Delete least recently used indexes until those built or loaded here fit
+    in `max_bytes`.
+
+    Indexes used in the last `min_idle_seconds` are never deleted, nor is one
+    being loaded right now; a deleted index is simply rebuilt if asked for again.
+    """
+    with _usage_lock:
+        usage = _read_usage()
+        sizes = {index_name: _index_bytes(index_name) for index_name in usage}
+        total = sum(sizes.values())
+        now = time.time()
+        for index_name in sorted(usage, key=usage.get):
+            if not sizes[index_name]:
+                # Deleted by hand or by another process
+                del usage[index_name]
+                continue
+            if total <= max_bytes or now - usage[index_name] < min_idle_seconds:
+                continue
+            lock = _index_lock(index_name)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                print(f"🧹 Deleting least recently used index {index_name}")
+                _vectorstore_cache.pop((VECTORSTORE_BACKEND, index_name))
+                shutil.rmtree(_chunks_path(index_name), ignore_errors=True)
+                shutil.rmtree(f"{_db_root()}/{index_name}", ignore_errors=True)
+                _usage_recorded.pop(index_name, None)
+                del usage[index_name]
+                total -= sizes[index_name]
+            finally:
+                lock.release()
+        _write_usage(usage)
+
+
+def _index_files(index_name):
+    chunks_dir = _chunks_path(index_name)
+    index_dir = f"{_db_root()}/{index_name}"
+    return [
+        os.path.join(root, name)
+        for directory in (chunks_dir, index_dir)
+        for root, _, names in os.walk(directory)
+        for name in names
+    ]
+
+
+def _open_faiss(index_name):
+    """Open a FAISS index whose documents are served lazily from its chunk store."""
+    import faiss
+    from langchain.vectorstores import FAISS
+
+    store = ChunkStore(_chunks_path(index_name), key=index_name)
+    index = configure_search(faiss.read_index(f"faiss_dbs/{index_name}/index.faiss"))
+    vectorstore = FAISS(
+        embedding_function=get_embeddings(),
+        index=index,
+        docstore=ChunkDocstore(store),
+        index_to_docstore_id=RowIds(index.ntotal),
     )
-    split_docs = splitter.split_documents(raw_docs)
+    vectorstore.exact_vectors = _open_exact_vectors(index_name, index.d)
+    return vectorstore, store
 
-    if VECTORSTORE_BACKEND == "chroma":
-        os.makedirs(f"chroma_dbs/{base_name}", exist_ok=True)
-        vectorstore = Chroma.from_documents(
-            documents=split_docs,
-            embedding=embeddings,
-            persist_directory=f"chroma_dbs/{base_name}"
-        )
+
+def _exact_vectors_path(index_name):
+    return f"faiss_dbs/{index_name}/vectors.f32"
+
+
+def _open_exact_vectors(index_name, dim):
+    """Memory-map the float32 vectors kept next to a quantized index, if any."""
+    import numpy as np
+
+    path = _exact_vectors_path(index_name)
+    if not FAISS_EXACT_RERANK or not os.path.exists(path) or not os.path.getsize(path):
+        return None
+    return np.memmap(path, dtype="float32", mode="r").reshape(-1, dim)
+
+
+def _write_faiss_index(index, index_name):
+    import faiss
+
+    os.makedirs(f"faiss_dbs/{index_name}", exist_ok=True)
+    tmp_path = f"faiss_dbs/{index_name}/index.faiss.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, f"faiss_dbs/{index_name}/index.faiss")
+
+
+def _embed_window(window):
+    import numpy as np
+
+    return np.asarray(
+        get_embeddings().embed_documents([doc.page_content for doc in window]),
+        dtype="float32",
+    )
+
+
+def _build_faiss(windows, writer, index_name, embed=_embed_window, builder=None):
+    """Embed chunk windows into a FAISS index of FAISS_INDEX_TYPE, row i = chunk i.
+
+    Quantized indexes only hold compressed codes, so the exact float32 vectors
+    are also streamed to disk for re-ranking (see retrieval._faiss_search).
+    """
+    builder = builder or IndexBuilder()
+    exact_file = None
+    if is_lossy() and FAISS_EXACT_RERANK:
+        os.makedirs(f"faiss_dbs/{index_name}", exist_ok=True)
+        exact_file = open(_exact_vectors_path(index_name) + ".tmp", "wb")
+    try:
+        for window in windows:
+            vectors = embed(window)
+            builder.add(vectors)
+            if exact_file is not None:
+                exact_file.write(vectors.tobytes())
+            writer.add(window)
+    finally:
+        if exact_file is not None:
+            exact_file.close()
+    if exact_file is not None:
+        os.replace(exact_file.name, _exact_vectors_path(index_name))
+    return builder.finish()
+
+
+def _text_digest(text):
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def _stored_vectors(index_name, index, lossy):
+    """Float32 vectors of an index, row i = chunk i, or None if only lossy codes remain."""
+    import faiss
+    import numpy as np
+
+    path = _exact_vectors_path(index_name)
+    if os.path.exists(path):
+        return np.memmap(path, dtype="float32", mode="r").reshape(-1, index.d)
+    if lossy:
+        return None
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def _update_faiss(previous, previous_settings, windows, writer, index_name):
+    """Build the index for a new version of a document from its previous one.
+
+    Chunks whose text is unchanged keep their stored vectors, so only new or
+    edited chunks are embedded; removed chunks are simply not carried over.
+    Rows still follow the new chunk order (row i = chunk i). An IVF index with
+    the same settings keeps its coarse quantizer if the new version gets the
+    same number of lists; the vector codec is always trained again.
+    `previous_settings` are the index settings the previous version was built with.
+    Returns None, without consuming `windows`, if nothing can be reused.
+    """
+    import faiss
+    import numpy as np
+
+    settings = previous_settings or {}
+    index = faiss.read_index(f"faiss_dbs/{previous}/index.faiss")
+    builder = None
+    if settings == index_settings() and settings["index_type"].startswith("ivf"):
+        builder = IndexBuilder.from_trained(index)
+    vectors = _stored_vectors(previous, index, settings.get("quantization") != "none")
+    if vectors is None:
+        return None
+
+    old_store = ChunkStore(_chunks_path(previous))
+    rows = {}
+    for row in range(len(old_store)):
+        rows.setdefault(_text_digest(old_store.text(row)), row)
+    counts = {"reused": 0, "embedded": 0}
+
+    def embed(window):
+        found = [rows.get(_text_digest(doc.page_content)) for doc in window]
+        missing = [doc.page_content for doc, row in zip(window, found) if row is None]
+        new_vectors = iter(get_embeddings().embed_documents(missing) if missing else [])
+        out = np.empty((len(window), index.d), dtype="float32")
+        for i, row in enumerate(found):
+            out[i] = vectors[row] if row is not None else next(new_vectors)
+        counts["embedded"] += len(missing)
+        counts["reused"] += len(window) - len(missing)
+        return out
+
+    result = _build_faiss(windows, writer, index_name, embed=embed, builder=builder)
+    print(
+        f"♻️ Incremental update: reused {counts['reused']} chunk vectors, "
+        f"embedded {counts['embedded']}, dropped {len(old_store) - counts['reused']}"
+    )
+    return result
+
+
+def _update_chroma(previous, windows, writer, index_name):
+    """Copy the previous version's Chroma collection and apply the chunk diff.
+
+    Unchanged chunks keep their ids and embeddings (their metadata is refreshed),
+    new chunks are added and chunks no longer present are deleted.
+    """
+    from langchain.vectorstores import Chroma
+
+    persist_directory = f"chroma_dbs/{index_name}"
+    shutil.rmtree(persist_directory, ignore_errors=True)
+    shutil.copytree(f"chroma_dbs/{previous}", persist_directory)
+    vectorstore = Chroma(persist_directory=persist_directory, embedding_function=get_embeddings())
+
+    stored = vectorstore.get(include=["documents"])
+    ids_by_text = {}
+    for chunk_id, text in zip(stored["ids"], stored["documents"]):
+        ids_by_text.setdefault(_text_digest(text), []).append(chunk_id)
+
+    reused = 0
+    for window in windows:
+        kept_ids, kept_metadata, new_docs = [], [], []
+        for doc in window:
+            ids = ids_by_text.get(_text_digest(doc.page_content))
+            if ids:
+                kept_ids.append(ids.pop())
+                kept_metadata.append(doc.metadata)
+            else:
+                new_docs.append(doc)
+        if kept_ids:
+            vectorstore._collection.update(ids=kept_ids, metadatas=kept_metadata)
+        if new_docs:
+            vectorstore.add_documents(new_docs)
+        reused += len(kept_ids)
+        writer.add(window)
+
+    removed = [chunk_id for ids in ids_by_text.values() for chunk_id in ids]
+    if removed:
+        vectorstore.delete(removed)
+    vectorstore.persist()
+    print(
+        f"♻️ Incremental update: kept {reused} chunks, "
+        f"added {len(writer) - reused}, deleted {len(removed)}"
+    )
+    return vectorstore
+
+
+def _build_chroma(windows, writer, index_name):
+    from langchain.vectorstores import Chroma
+
+    vectorstore = None
+    for window in windows:
+        if vectorstore is None:
+            vectorstore = Chroma.from_documents(
+                documents=window,
+                embedding=get_embeddings(),
+                persist_directory=f"chroma_dbs/{index_name}"
+            )
+        else:
+            vectorstore.add_documents(window)
+        writer.add(window)
+    if vectorstore is not None:
         vectorstore.persist()
+    return vectorstore
 
-    elif VECTORSTORE_BACKEND == "faiss":
-        os.makedirs("faiss_dbs", exist_ok=True)
-        vectorstore = FAISS.from_documents(split_docs, embedding=embeddings)
-        vectorstore.save_local(f"faiss_dbs/{base_name}")
 
-        # Save original docs to allow context fallback later
-        with open(f"faiss_dbs/{base_name}.pkl", "wb") as f:
-            pickle.dump(split_docs, f)
+# Process-wide registry of loaded vectorstores, keyed by backend and index name.
+# Each entry remembers the on-disk stamp it was loaded from so that a rebuilt or
+# replaced index is reloaded instead of served stale.
+_vectorstore_cache = LRUCache(
+    max_entries=VECTORSTORE_CACHE_MAX_ENTRIES,
+    max_bytes=VECTORSTORE_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=lambda entry: entry[1],
+)
+
+
+def _index_stamp(index_name):
+    """(mtime, size) of every file backing an index, plus their total size."""
+    stamp = []
+    total_bytes = 0
+    for path in sorted(_index_files(index_name)):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamp.append((path, st.st_mtime_ns, st.st_size))
+        total_bytes += st.st_size
+    return tuple(stamp), total_bytes
+
+
+def _cached_vectorstore(index_name):
+    key = (VECTORSTORE_BACKEND, index_name)
+    entry = _vectorstore_cache.get(key)
+    if entry is None:
+        return None
+    stamp, _, result = entry
+    if stamp != _index_stamp(index_name)[0]:
+        # Index changed on disk since it was loaded
+        _vectorstore_cache.pop(key)
+        return None
+    return result
+
+
+def _cache_vectorstore(index_name, result):
+    stamp, total_bytes = _index_stamp(index_name)
+    _vectorstore_cache.put((VECTORSTORE_BACKEND, index_name), (stamp, total_bytes, result))
+    return result
+
+
+def clear_vectorstore_cache():
+    _vectorstore_cache.clear()
+
+
+_index_locks = {}
+_index_locks_guard = threading.Lock()
+
+
+def _index_lock(index_name):
+    with _index_locks_guard:
+        return _index_locks.setdefault(index_name, threading.Lock())
+
+
+# Load vectorstore (FAISS or Chroma)
+def load_vectorstore(pdf_name, progress=None, pdf_path=None, owner=None):
+    """Return (vectorstore, chunks) for a PDF in documents/, building it if needed.
+
+    `chunks` is the document's ChunkStore: a lazily read sequence of the split
+    Documents, also used for fallback context. While building, `progress` is
+    called with (fraction of pages indexed, message) after every window.
+    `pdf_path` reads the PDF from elsewhere (e.g. a stored upload) while
+    `pdf_name` and `owner` (e.g. an app session) identify its earlier versions.
+    """
+    pdf_path = pdf_path or f"documents/{pdf_name}"
+    index_name = index_key(pdf_path)
+
+    result = _cached_vectorstore(index_name)
+    if result is None:
+        # Concurrent requests for the same document wait for one load or build
+        with _index_lock(index_name):
+            result = _cached_vectorstore(index_name)
+            if result is None:
+                result = _load_or_build(pdf_name, pdf_path, index_name, progress, owner)
+    _record_lineage(pdf_name, pdf_path, index_name, owner)
+    _record_use(index_name)
+    return result
+
+
+def _with_progress(windows, pdf_path, progress):
+    total_pages = max(page_count(pdf_path), 1)
+    chunks = 0
+    for window in windows:
+        yield window
+        # Reached once the window has been embedded and indexed
+        chunks += len(window)
+        page = max((doc.metadata.get("page", 0) for doc in window), default=0) + 1
+        progress(min(page / total_pages, 1.0), f"Indexed {chunks} chunks ({page}/{total_pages} pages)")
+
+
+def _load_or_build(pdf_name, pdf_path, index_name, progress=None, owner=None):
+    if VECTORSTORE_BACKEND not in ("chroma", "faiss"):
+        raise ValueError(f"Unsupported VECTORSTORE_BACKEND: {VECTORSTORE_BACKEND}")
+
+    if is_indexed(index_name):
+        print(f"📦 Loading {VECTORSTORE_BACKEND} vectorstore for {pdf_name} ({index_name})")
+        if VECTORSTORE_BACKEND == "chroma":
+            from langchain.vectorstores import Chroma
+            vectorstore = Chroma(persist_directory=f"chroma_dbs/{index_name}", embedding_function=get_embeddings())
+            result = (vectorstore, ChunkStore(_chunks_path(index_name), key=index_name))
+        else:
+            result = _open_faiss(index_name)
+        return _cache_vectorstore(index_name, result)
+
+    # Create vectorstore if none exists
+    print(f"📄 Creating vectorstore for {pdf_name} ({index_name})")
+    if INGEST_STREAMING:
+        # Chunks are embedded and indexed window by window while later pages
+        # are still being parsed
+        windows = iter_chunk_windows(pdf_path)
+    else:
+        windows = [load_chunks(pdf_path)]
+    if progress is not None:
+        windows = _with_progress(windows, pdf_path, progress)
+
+    os.makedirs(_db_root(), exist_ok=True)
+    previous_entry = _previous_version(pdf_name, pdf_path, index_name, owner)
+    previous = previous_entry["key"] if previous_entry else None
+    writer = ChunkStoreWriter(_chunks_path(index_name))
+    try:
+        if VECTORSTORE_BACKEND == "chroma":
+            if previous is not None:
+                print(f"♻️ Updating from previous version ({previous})")
+                vectorstore = _update_chroma(previous, windows, writer, index_name)
+            else:
+                vectorstore = _build_chroma(windows, writer, index_name)
+        else:
+            index = None
+            if previous is not None:
+                print(f"♻️ Updating from previous version ({previous})")
+                index = _update_faiss(previous, previous_entry.get("index"), windows, writer, index_name)
+            if index is None and not len(writer):
+                index = _build_faiss(windows, writer, index_name)
+            if index is not None:
+                _write_faiss_index(index, index_name)
+        if not len(writer):
+            raise ValueError(f"No text could be extracted from {pdf_name}")
+    except BaseException:
+        writer.abort()
+        raise
+    store = writer.close()
+
+    if VECTORSTORE_BACKEND == "chroma":
+        result = (vectorstore, ChunkStore(store.path, key=index_name))
+    else:
+        result = _open_faiss(index_name)
+    _record_use(index_name)
+    # The disk just grew: make room from indexes nobody has used lately
+    sweep_indexes()
+    return _cache_vectorstore(index_name, result)
+
 
-    return vectorstore, split_docs
+async def aload_vectorstore(pdf_name):
+    """load_vectorstore in a worker thread, for async request handlers."""
+    return await asyncio.to_thread(load_vectorstore, pdf_name)
@@ -0,0 +1,94 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema.embeddings import Embeddings
+
+from config import (
+    LOCAL_EMBED_MODEL,
+    LOCAL_EMBED_BATCH_SIZE,
+    LOCAL_EMBED_THREADS,
+    LOCAL_EMBED_QUANTIZATION,
+    LOCAL_EMBED_CACHE_DIR,
+)
+
+QUANTIZATIONS = ("none", "int8")
+
+# (model name, quantization, cache dir) -> loaded SentenceTransformer, shared
+# by every LocalEmbeddings so the model is read from disk once per process
+_models: Dict[Tuple[str, str, Optional[str]], object] = {}
+_models_lock = threading.Lock()
+
+
+def model_id(model_name: str = LOCAL_EMBED_MODEL, quantization: str = LOCAL_EMBED_QUANTIZATION) -> str:
+    """Model name plus quantization: int8 weights give slightly different
+    vectors, so they must not share indexes or cached embeddings with fp32.
+    """
+    return model_name if quantization == "none" else f"{model_name}+{quantization}"
+
+
+def _load_model(model_name: str, quantization: str, cache_dir: Optional[str]):
+    key = (model_name, quantization, cache_dir)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            import torch
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_name, device="cpu", cache_folder=cache_dir)
+            model.eval()
+            if quantization == "int8":
+                # Dynamic quantization: int8 Linear weights, activations
+                # quantized on the fly; faster on CPU at a small accuracy cost
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            print(f"🧮 Loaded local embedding model {model_id(model_name, quantization)}")
+            _models[key] = model
+    return model
+
+
+class LocalEmbeddings(Embeddings):
+    """Embeds text with a sentence-transformers model on the local CPU.
+
+    No network calls once the model is on disk (point LOCAL_EMBED_CACHE_DIR at
+    pre-downloaded weights and set HF_HUB_OFFLINE=1 for air-gapped hosts).
+    Vectors are L2-normalized.
+    """
+
+    def __init__(
+        self,
+        model_name: str = LOCAL_EMBED_MODEL,
+        batch_size: int = LOCAL_EMBED_BATCH_SIZE,
+        threads: int = LOCAL_EMBED_THREADS,
+        quantization: str = LOCAL_EMBED_QUANTIZATION,
+        cache_dir: Optional[str] = LOCAL_EMBED_CACHE_DIR,
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported LOCAL_EMBED_QUANTIZATION: {quantization}")
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.quantization = quantization
+        self.model = _load_model(model_name, quantization, cache_dir)
+        # One forward pass at a time: torch already spreads each batch over
+        # the configured threads, concurrent calls only fight over the cores
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from typing import Callable, List, Optional
+
+from langchain.schema.document import Document
+
+from answer_cache import normalize_query
+from cache import LRUCache
+from config import (
+    RERANK_ENABLED,
+    RERANK_MODEL,
+    RERANK_TOP_K,
+    RERANK_BATCH_SIZE,
+    RERANK_TIME_BUDGET_MS,
+    RERANK_CACHE_MAX_ENTRIES,
+)
+
+# (query, chunk texts) -> one relevance score per text, higher is better
+Scorer = Callable[[str, List[str]], List[float]]
+
+
+class CrossEncoderScorer:
+    """Scores (query, chunk) pairs with a sentence-transformers cross-encoder on CPU."""
+
+    def __init__(self, model_name: str = RERANK_MODEL):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+        # One batch at a time: concurrent predicts only fight over the same cores
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str, texts: List[str]) -> List[float]:
+        with self._lock:
+            scores = self.model.predict([(query, text) for text in texts], batch_size=len(texts))
+        return [float(score) for score in scores]
+
+
+class Reranker:
+    """Re-orders retrieved candidates by a (query, chunk) relevance scorer.
+
+    Candidates are scored in batches in their retrieval order and scores are
+    cached per (normalized query, chunk text). Once `time_budget_ms` is spent,
+    the remaining candidates are left unscored and rank after the scored ones
+    in their original order.
+    """
+
+    def __init__(
+        self,
+        scorer: Scorer,
+        top_k: int = RERANK_TOP_K,
+        batch_size: int = RERANK_BATCH_SIZE,
+        time_budget_ms: float = RERANK_TIME_BUDGET_MS,
+        cache_entries: int = RERANK_CACHE_MAX_ENTRIES,
+    ):
+        self.scorer = scorer
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.time_budget_ms = time_budget_ms
+        self._scores = LRUCache(max_entries=cache_entries)
+
+    def rerank(self, query: str, docs: List[Document], top_k: Optional[int] = None) -> List[Document]:
+        top_k = top_k or self.top_k
+        normalized = normalize_query(query)
+        keys = [
+            (normalized, hashlib.sha1(doc.page_content.encode("utf-8")).digest())
+            for doc in docs
+        ]
+        scores = [self._scores.get(key) for key in keys]
+
+        pending = [i for i, score in enumerate(scores) if score is None]
+        deadline = time.monotonic() + self.time_budget_ms / 1000
+        for start in range(0, len(pending), self.batch_size):
+            if start and time.monotonic() > deadline:
+                print(f"⏱️ Rerank budget spent: {len(pending) - start} candidates left unscored")
+                break
+            batch = pending[start:start + self.batch_size]
+            for i, score in zip(batch, self.scorer(query, [docs[i].page_content for i in batch])):
+                scores[i] = score
+                self._scores.put(keys[i], score)
+
+        scored = sorted((i for i, score in enumerate(scores) if score is not None), key=lambda i: -scores[i])
+        unscored = [i for i, score in enumerate(scores) if score is None]
+        return [docs[i] for i in (scored + unscored)[:top_k]]
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+_load_failed = False
+
+
+def set_reranker(reranker: Optional[Reranker]) -> None:
+    """Install a reranker with a custom scorer (None restores the default)."""
+    global _reranker
+    _reranker = reranker
+
+
+def get_reranker() -> Optional[Reranker]:
+    """The active reranker, or None; the default cross-encoder loads on first use."""
+    global _reranker, _load_failed
+    if _reranker is None and RERANK_ENABLED and not _load_failed:
+        with _reranker_lock:
+            if _reranker is None and not _load_failed:
+                try:
+                    _reranker = Reranker(CrossEncoderScorer())
+                except ImportError:
+                    print("⚠️ RERANK_ENABLED needs sentence-transformers; reranking is off")
+                    _load_failed = True
+    return _reranker
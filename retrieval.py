@@ -0,0 +1,161 @@
+from typing import List
+
+from langchain.schema.document import Document
+
+from bm25 import tokenize
+from config import (
+    K_RETRIEVAL,
+    FAISS_RERANK_FACTOR,
+    HYBRID_RETRIEVAL,
+    HYBRID_CANDIDATES,
+    LEXICAL_ONLY_MAX_TERMS,
+    RRF_K,
+    RERANK_CANDIDATES,
+)
+from rerank import get_reranker
+
+QUESTION_WORDS = frozenset("""
+what which who whom whose when where why how is are was were does do did can
+could should would explain describe summarize compare list give tell
+""".split())
+
+
+def embed_queries(vectorstore, queries: List[str]) -> List[List[float]]:
+    embeddings = vectorstore.embeddings
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(queries)
+    if len(queries) == 1:
+        return [embeddings.embed_query(queries[0])]
+    return embeddings.embed_documents(queries)
+
+
+def _is_faiss(vectorstore) -> bool:
+    return hasattr(vectorstore, "index") and hasattr(vectorstore, "index_to_docstore_id")
+
+
+def _rerank_exact(matrix, rows, exact_vectors, k: int):
+    """Re-order candidates from a quantized index by exact L2 distance."""
+    import numpy as np
+
+    reranked = []
+    for query, candidates in zip(matrix, rows):
+        candidates = candidates[candidates >= 0]
+        distances = ((np.asarray(exact_vectors[candidates]) - query) ** 2).sum(axis=1)
+        reranked.append(candidates[np.argsort(distances, kind="stable")[:k]])
+    return reranked
+
+
+def _faiss_search(vectorstore, vectors: List[List[float]], k: int) -> List[List[Document]]:
+    import faiss
+    import numpy as np
+
+    matrix = np.asarray(vectors, dtype="float32")
+    if getattr(vectorstore, "_normalize_L2", False):
+        faiss.normalize_L2(matrix)
+    exact_vectors = getattr(vectorstore, "exact_vectors", None)
+    if exact_vectors is None:
+        _, rows = vectorstore.index.search(matrix, k)
+    else:
+        _, rows = vectorstore.index.search(matrix, k * FAISS_RERANK_FACTOR)
+        rows = _rerank_exact(matrix, rows, exact_vectors, k)
+
+    results = []
+    for query_rows in rows:
+        docs = []
+        for row in query_rows:
+            if row == -1:
+                continue
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[row])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        results.append(docs)
+    return results
+
+
+def _vector_search(vectorstore, queries: List[str], k: int) -> List[List[Document]]:
+    vectors = embed_queries(vectorstore, queries)
+    if _is_faiss(vectorstore):
+        return _faiss_search(vectorstore, vectors, k)
+    return [vectorstore.similarity_search_by_vector(vector, k=k) for vector in vectors]
+
+
+def is_keyword_query(query: str) -> bool:
+    """A few bare search terms ("BRCA1 knockout") rather than a question."""
+    words = query.lower().split()
+    if not words or "?" in query or words[0] in QUESTION_WORDS:
+        return False
+    return 0 < len(tokenize(query)) <= LEXICAL_ONLY_MAX_TERMS
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """Merge ranked lists, scoring each chunk by the sum of 1 / (rrf_k + rank)."""
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(doc.page_content, doc)
+    best = sorted(scores, key=lambda text: -scores[text])
+    return [docs[text] for text in best[:k]]
+
+
+def _chunk_store(vectorstore, chunks):
+    if chunks is not None:
+        return chunks
+    return getattr(getattr(vectorstore, "docstore", None), "store", None)
+
+
+def batch_similarity_search(
+    vectorstore,
+    queries: List[str],
+    k: int = K_RETRIEVAL,
+    chunks=None,
+) -> List[List[Document]]:
+    """Top-k documents for each query, in query order.
+
+    All queries are embedded in one provider call (cached ones are skipped) and,
+    for FAISS, searched with a single matrix query. With HYBRID_RETRIEVAL and a
+    chunk store that has a BM25 index (`chunks`, or the FAISS docstore's), BM25
+    and vector hits are fused by reciprocal rank, and keyword-style queries
+    with lexical hits are answered from BM25 without being embedded.
+    """
+    if not queries:
+        return []
+    store = _chunk_store(vectorstore, chunks)
+    lexical = getattr(store, "lexical", None) if HYBRID_RETRIEVAL else None
+    if lexical is None:
+        return _vector_search(vectorstore, queries, k)
+
+    candidates = max(k, HYBRID_CANDIDATES)
+    lexical_hits = [
+        [store[chunk_id] for chunk_id, _ in lexical.search(query, candidates)]
+        for query in queries
+    ]
+    embed = [
+        i for i, query in enumerate(queries)
+        if not (lexical_hits[i] and is_keyword_query(query))
+    ]
+    vector_hits = {}
+    if embed:
+        found = _vector_search(vectorstore, [queries[i] for i in embed], candidates)
+        vector_hits = dict(zip(embed, found))
+
+    return [
+        reciprocal_rank_fusion([vector_hits[i], hits], k) if i in vector_hits else hits[:k]
+        for i, hits in enumerate(lexical_hits)
+    ]
+
+
+def batch_retrieve(vectorstore, queries: List[str], chunks=None) -> List[List[Document]]:
+    """QA context for each query: the top K_RETRIEVAL chunks, or, with a
+    reranker, its best RERANK_TOP_K of RERANK_CANDIDATES retrieved chunks.
+    """
+    reranker = get_reranker()
+    if reranker is None:
+        return batch_similarity_search(vectorstore, queries, k=K_RETRIEVAL, chunks=chunks)
+    candidates = batch_similarity_search(vectorstore, queries, k=RERANK_CANDIDATES, chunks=chunks)
+    return [reranker.rerank(query, docs) for query, docs in zip(queries, candidates)]
+
+
+def retrieve(vectorstore, query: str, chunks=None) -> List[Document]:
+    return batch_retrieve(vectorstore, [query], chunks=chunks)[0]
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The app modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from langchain_community.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+import context_builder  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    # No BPE download: token counts use the characters-per-token estimate
+    monkeypatch.setattr(context_builder, "_encoding", False)
+
+
+@pytest.fixture
+def fake_embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, as indexes are written relative to it."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
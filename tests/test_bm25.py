@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+from bm25 import BM25Builder, BM25Index, tokenize
+from config import BM25_B, BM25_K1
+
+TEXTS = [
+    "IL-6 levels rise in the acute phase of inflammation.",
+    "Inflammation markers were measured in every patient.",
+    "Patient outcomes improved after treatment; inflammation subsided.",
+    "The treatment group and the control group were matched.",
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return BM25Index.from_texts(TEXTS, str(tmp_path))
+
+
+def test_tokenize_keeps_identifiers_and_drops_stopwords():
+    assert tokenize("What is the role of IL-6 and BRCA1?") == ["role", "il-6", "brca1"]
+
+
+def test_score_matches_okapi_bm25(index):
+    tokens = [tokenize(text) for text in TEXTS]
+    avg_length = sum(map(len, tokens)) / len(tokens)
+
+    def expected(term, chunk_id):
+        n = sum(term in doc for doc in tokens)
+        tf = tokens[chunk_id].count(term)
+        idf = math.log(1 + (len(TEXTS) - n + 0.5) / (n + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens[chunk_id]) / avg_length)
+        return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    results = dict(index.search("patient treatment", k=10))
+    assert set(results) == {1, 2, 3}
+    for chunk_id, score in results.items():
+        assert score == pytest.approx(expected("patient", chunk_id) + expected("treatment", chunk_id))
+
+
+def test_rare_terms_outrank_common_ones(index):
+    # "inflammation" is in three chunks, "il-6" in one
+    results = index.search("il-6 inflammation", k=2)
+    assert [chunk_id for chunk_id, _ in results] == [0, 1]
+    assert results[0][1] > results[1][1]
+
+
+def test_stopword_and_unknown_queries_find_nothing(index):
+    assert index.search("what is the", k=5) == []
+    assert index.search("cytokine", k=5) == []
+
+
+def test_reload_keeps_only_chunks_below_count(index, tmp_path):
+    builder = BM25Builder.load(str(tmp_path), count=2)
+    builder.add("A new treatment paragraph.")
+    builder.write(str(tmp_path))
+
+    reloaded = BM25Index(str(tmp_path))
+    assert len(reloaded) == 3
+    assert [chunk_id for chunk_id, _ in reloaded.search("treatment", k=5)] == [2]
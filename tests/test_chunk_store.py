@@ -0,0 +1,78 @@
+import os
+
+import pytest
+from langchain.schema.document import Document
+
+from bm25 import TERMS_FILE
+from chunk_store import ChunkStore, ChunkStoreWriter
+
+
+def make_docs():
+    return [
+        Document(page_content="Introduction: why we study é and ü", metadata={"source": "a.pdf", "page": 0}),
+        Document(page_content="Methods were applied to 42 participants", metadata={"source": "a.pdf", "page": 1}),
+        Document(page_content="", metadata={"source": "a.pdf", "page": 1, "empty": True}),
+        Document(page_content="In conclusion, it works", metadata={"source": "a.pdf", "page": 2}),
+    ]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "doc.chunks")
+    docs = make_docs()
+    writer = ChunkStoreWriter(path)
+    writer.add(docs[:2])
+    writer.add(docs[2:])
+    assert len(writer) == 4
+    assert not os.path.exists(path)  # only renamed into place on close
+    writer.close()
+
+    store = ChunkStore(path, key="abc")
+    assert store.key == "abc"
+    assert len(store) == 4
+    for chunk_id, doc in enumerate(docs):
+        assert store.text(chunk_id) == doc.page_content
+        assert store[chunk_id].page_content == doc.page_content
+        assert store[chunk_id].metadata == {**doc.metadata, "chunk_id": chunk_id}
+    assert [doc.page_content for doc in store] == [doc.page_content for doc in docs]
+    assert store[-1].page_content == docs[-1].page_content
+    with pytest.raises(IndexError):
+        store[4]
+    assert [doc.metadata["chunk_id"] for doc in store.fallback_chunks(5)] == [0, 3]
+    assert store.lexical.search("participants", 1)[0][0] == 1
+
+
+def test_abort_leaves_nothing(tmp_path):
+    path = str(tmp_path / "doc.chunks")
+    writer = ChunkStoreWriter(path)
+    writer.add(make_docs())
+    writer.abort()
+    assert os.listdir(tmp_path) == []
+
+
+def test_resume_discards_uncommitted_chunks(tmp_path):
+    path = str(tmp_path / "shard")
+    docs = make_docs()
+    ChunkStore.write(path, docs[:3])
+
+    # Only the first two chunks were committed; the third is dropped
+    writer = ChunkStoreWriter.resume(path, 2)
+    writer.add(docs[3:])
+    store = writer.close()
+
+    assert [doc.page_content for doc in store] == [docs[0].page_content, docs[1].page_content, docs[3].page_content]
+    assert store[2].metadata["page"] == 2
+    assert "empty" not in store[2].metadata
+    assert [doc.metadata["chunk_id"] for doc in store.fallback_chunks(5)] == [0, 2]
+    assert [chunk_id for chunk_id, _ in store.lexical.search("conclusion", 5)] == [2]
+
+
+def test_without_lexical_index(tmp_path):
+    path = str(tmp_path / "shard")
+    ChunkStore.write(path, make_docs()[:2])
+    assert os.path.exists(os.path.join(path, TERMS_FILE))
+
+    writer = ChunkStoreWriter.resume(path, 2, lexical=False)
+    writer.add(make_docs()[3:])
+    writer.close()
+    # Stale postings would no longer match the chunks
+    assert not os.path.exists(os.path.join(path, TERMS_FILE))
@@ -0,0 +1,78 @@
+import pytest
+from langchain.schema.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from context_builder import MIN_PASSAGE_TOKENS, build_context, count_tokens, pack_documents
+
+TEXT = " ".join(f"Sentence {i} reports a distinct finding about cohort {i * 7}." for i in range(40))
+
+
+def chunk(text, chunk_id, page=0, source="paper.pdf"):
+    return Document(page_content=text, metadata={"source": source, "page": page, "chunk_id": chunk_id})
+
+
+@pytest.fixture
+def chunks():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=60)
+    return [chunk(text, i) for i, text in enumerate(splitter.split_text(TEXT))]
+
+
+def test_adjacent_chunks_merge_without_their_overlap(chunks):
+    # Retrieved out of order: the merged passage still reads in document order
+    passages = pack_documents(list(reversed(chunks)), budget=None)
+    assert [passage.page_content for passage in passages] == [TEXT]
+
+
+def test_passages_keep_the_rank_of_their_best_chunk(chunks):
+    other = chunk("An unrelated paragraph from another paper.", 0, source="other.pdf")
+    passages = pack_documents([chunks[5], other, chunks[1], chunks[4]], budget=None)
+    assert [passage.page_content for passage in passages] == [
+        pack_documents(chunks[4:6], budget=None)[0].page_content,
+        other.page_content,
+        chunks[1].page_content,
+    ]
+
+
+def test_duplicates_are_dropped(chunks):
+    copy = Document(page_content=chunks[2].page_content, metadata={"source": "copy.pdf"})
+    passages = pack_documents([chunks[2], copy, chunks[2]], budget=None)
+    assert [passage.page_content for passage in passages] == [chunks[2].page_content]
+
+
+def test_chunks_on_different_pages_are_joined_by_a_newline():
+    first = chunk("The end of page one mentions the cohort size.", 0, page=0)
+    second = chunk("cohort size. Page two starts a new section.", 1, page=1)
+    passages = pack_documents([first, second], budget=None)
+    assert passages[0].page_content == f"{first.page_content}\n{second.page_content}"
+
+
+def test_short_coincidental_matches_are_not_overlap():
+    first = chunk("Results were strong", 0)
+    second = chunk("strong evidence followed.", 1)
+    passages = pack_documents([first, second], budget=None)
+    assert passages[0].page_content == "Results were strong\nstrong evidence followed."
+
+
+def test_packing_stays_within_the_budget():
+    docs = [Document(page_content=f"{i} " + "word " * 80) for i in range(10)]
+    for budget in (30, 150, 500, 1000):
+        context = build_context(docs, budget)
+        assert count_tokens(context) <= budget
+        assert context
+
+
+def test_the_first_passage_that_does_not_fit_is_truncated():
+    docs = [Document(page_content=f"{i} " + "x" * 398) for i in range(3)]  # 100 tokens each
+    separator = count_tokens("\n\n")
+
+    packed = pack_documents(docs, budget=100 + separator + MIN_PASSAGE_TOKENS)
+    assert [count_tokens(doc.page_content) for doc in packed] == [100, MIN_PASSAGE_TOKENS]
+    assert docs[1].page_content.startswith(packed[1].page_content)
+
+    # Too little room left for a useful piece of the second passage
+    packed = pack_documents(docs, budget=100 + separator + MIN_PASSAGE_TOKENS - 1)
+    assert [doc.page_content for doc in packed] == [docs[0].page_content]
+
+    # The best passage is always included, truncated if need be
+    packed = pack_documents(docs, budget=10)
+    assert [count_tokens(doc.page_content) for doc in packed] == [10]
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from embedding_pipeline import BatchedEmbeddings
+
+
+class RateLimitError(Exception):
+    """Named like the OpenAI client's error, which is all the pipeline looks at."""
+
+
+class FlakyEmbeddings:
+    """Wraps an embedder, failing the first `failures` calls with `error`."""
+
+    def __init__(self, base, failures=0, error=RateLimitError("429 rate limit"), delay=0.0):
+        self.base = base
+        self.failures = failures
+        self.error = error
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls.append((time.monotonic(), list(texts)))
+            fail = len(self.calls) <= self.failures
+        if fail:
+            raise self.error
+        # Later batches finish first, so results arrive out of order
+        time.sleep(self.delay / (1 + int(texts[0].split()[-1])))
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.base.embed_query(text)
+
+
+def texts(n):
+    return [f"chunk {i}" for i in range(n)]
+
+
+def test_results_follow_input_order(fake_embeddings):
+    base = FlakyEmbeddings(fake_embeddings, delay=0.05)
+    pipeline = BatchedEmbeddings(base, batch_size=3, max_workers=4)
+
+    vectors = pipeline.embed_documents(texts(10))
+
+    assert vectors == fake_embeddings.embed_documents(texts(10))
+    assert sorted(len(batch) for _, batch in base.calls) == [1, 3, 3, 3]
+    assert pipeline.last_stats["chunks"] == 10
+    assert pipeline.last_stats["batches"] == 4
+
+
+def test_empty_input_makes_no_calls(fake_embeddings):
+    base = FlakyEmbeddings(fake_embeddings)
+    assert BatchedEmbeddings(base).embed_documents([]) == []
+    assert base.calls == []
+
+
+def test_rate_limit_is_retried_after_a_pause(fake_embeddings):
+    base = FlakyEmbeddings(fake_embeddings, failures=2)
+    pipeline = BatchedEmbeddings(base, batch_size=4, max_workers=1, backoff_seconds=0.02)
+
+    vectors = pipeline.embed_documents(texts(4))
+
+    assert vectors == fake_embeddings.embed_documents(texts(4))
+    assert len(base.calls) == 3
+    # Backoff doubles: at least 0.02s, then 0.04s between attempts
+    (first, _), (second, _), (third, _) = base.calls
+    assert second - first >= 0.02
+    assert third - second >= 0.04
+    # A rate limit pauses every worker, not just the one that hit it
+    assert pipeline._pause_until > first
+
+
+def test_gives_up_after_max_retries(fake_embeddings):
+    base = FlakyEmbeddings(fake_embeddings, failures=10)
+    pipeline = BatchedEmbeddings(base, max_retries=2, backoff_seconds=0.001)
+
+    with pytest.raises(RateLimitError):
+        pipeline.embed_documents(texts(2))
+    assert len(base.calls) == 3
+
+
+def test_other_errors_are_not_retried(fake_embeddings):
+    base = FlakyEmbeddings(fake_embeddings, failures=1, error=ValueError("bad input"))
+
+    with pytest.raises(ValueError):
+        BatchedEmbeddings(base, backoff_seconds=0.001).embed_documents(texts(2))
+    assert len(base.calls) == 1
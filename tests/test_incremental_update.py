@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from langchain.schema.document import Document
+
+import loader
+from chunk_store import ChunkStoreWriter
+from faiss_index import index_settings
+
+PAPER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents", "TWDpdf.pdf")
+
+
+class CountingEmbeddings:
+    def __init__(self, base):
+        self.base = base
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.base.embed_query(text)
+
+
+@pytest.fixture
+def embeddings(workdir, fake_embeddings, monkeypatch):
+    embeddings = CountingEmbeddings(fake_embeddings)
+    monkeypatch.setattr(loader, "get_embeddings", lambda: embeddings)
+    loader.clear_vectorstore_cache()
+    yield embeddings
+    loader.clear_vectorstore_cache()
+
+
+def chunks(texts):
+    return [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(texts)]
+
+
+def build(name, texts):
+    writer = ChunkStoreWriter(loader._chunks_path(name))
+    loader._write_faiss_index(loader._build_faiss([chunks(texts)], writer, name), name)
+    return writer.close()
+
+
+def test_rows_follow_the_new_chunk_order(embeddings, fake_embeddings):
+    build("old", ["alpha", "beta", "gamma", "delta"])
+    embeddings.embedded.clear()
+
+    new_texts = ["gamma", "epsilon", "alpha", "delta", "zeta"]
+    writer = ChunkStoreWriter(loader._chunks_path("new"))
+    index = loader._update_faiss("old", index_settings(), [chunks(new_texts[:2]), chunks(new_texts[2:])], writer, "new")
+    store = writer.close()
+
+    # Only new chunks are embedded; the others reuse their stored vectors
+    assert embeddings.embedded == ["epsilon", "zeta"]
+    assert index.ntotal == len(store) == len(new_texts)
+    for row, text in enumerate(new_texts):
+        assert store.text(row) == text
+        np.testing.assert_allclose(index.reconstruct(row), fake_embeddings.embed_query(text), rtol=1e-6)
+
+
+def save_pages(path, pages):
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(PAPER)
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(reader.pages[page])
+    writer.write(path)
+
+
+def test_sessions_only_update_from_their_own_uploads(embeddings):
+    os.makedirs("uploads")
+    save_pages("uploads/v1.pdf", range(0, 4))
+    save_pages("uploads/v2.pdf", range(1, 5))
+    save_pages("uploads/other.pdf", range(5, 9))
+
+    loader.load_vectorstore("paper.pdf", pdf_path="uploads/v1.pdf", owner="alice")
+    loader.load_vectorstore("paper.pdf", pdf_path="uploads/other.pdf", owner="bob")
+    other = loader.index_key("uploads/other.pdf")
+    embeddings.embedded.clear()
+
+    # Alice's re-upload reuses the vectors of her own first version only
+    _, store = loader.load_vectorstore("paper.pdf", pdf_path="uploads/v2.pdf", owner="alice")
+    assert 0 < len(embeddings.embedded) < len(store)
+
+    # Bob's unrelated paper.pdf is neither evicted nor scheduled for deletion
+    assert loader._cached_vectorstore(other) is not None
+    loader.sweep_indexes(max_bytes=0)
+    assert loader.is_indexed(other)
+
+
+def test_least_recently_used_indexes_are_deleted_when_idle(embeddings):
+    shutil.copy(PAPER, "a.pdf")
+    save_pages("b.pdf", range(0, 3))
+    loader.load_vectorstore("a.pdf", pdf_path="a.pdf")
+    loader.load_vectorstore("b.pdf", pdf_path="b.pdf")
+    a, b = loader.index_key("a.pdf"), loader.index_key("b.pdf")
+
+    loader.sweep_indexes(max_bytes=loader._index_bytes(b), min_idle_seconds=0)
+
+    assert not loader.is_indexed(a)
+    assert loader.is_indexed(b)
+    assert loader._cached_vectorstore(a) is None
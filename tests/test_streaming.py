@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from langchain.schema.document import Document
+from langchain_community.llms.fake import FakeStreamingListLLM
+from langchain_community.vectorstores import FAISS
+
+import utils
+from config import IMPORTANT_QUESTION_KEYWORDS
+
+DOCS = [
+    Document(page_content="Introduction: we study sleep in mice.", metadata={"page": 0}),
+    Document(page_content="Methods: mice were observed for ten nights.", metadata={"page": 1}),
+    Document(page_content="In conclusion, mice sleep more in winter.", metadata={"page": 2}),
+]
+
+
+class CountingLLM(FakeStreamingListLLM):
+    """FakeStreamingListLLM that records the prompt of every streamed call."""
+
+    prompts: list = []
+
+    async def astream(self, input, config=None, **kwargs):
+        self.prompts.append(input)
+        async for token in super().astream(input, config, **kwargs):
+            yield token
+
+
+@pytest.fixture
+def vectorstore(fake_embeddings):
+    return FAISS.from_documents(DOCS, fake_embeddings)
+
+
+def use_llm(monkeypatch, *responses):
+    llm = CountingLLM(responses=list(responses), prompts=[])
+    monkeypatch.setattr(utils, "get_llm", lambda *args, **kwargs: llm)
+    monkeypatch.setattr(utils, "_chains", {})
+    return llm
+
+
+def stream(question, vectorstore):
+    async def collect():
+        return [answer async for answer in utils.astream_best_answer(question, vectorstore, DOCS)]
+
+    return asyncio.run(collect())
+
+
+def test_streams_the_growing_answer(monkeypatch, vectorstore):
+    llm = use_llm(monkeypatch, "Mice were observed.")
+
+    answers = stream("How were the mice studied?", vectorstore)
+
+    assert answers[-1] == "Mice were observed."
+    assert len(answers) == len("Mice were observed.")
+    assert all(later.startswith(earlier) for earlier, later in zip(answers, answers[1:]))
+    assert len(llm.prompts) == 1
+    assert "Use ONLY the context" in llm.prompts[0]
+
+
+def test_restarts_with_the_fallback_answer(monkeypatch, vectorstore):
+    llm = use_llm(monkeypatch, "Not found in the provided context.", "They sleep more in winter.")
+
+    answers = stream("When do mice sleep?", vectorstore)
+
+    assert "Not found in the provided context." in answers
+    assert answers[-1] == "They sleep more in winter."
+    assert len(llm.prompts) == 2
+    assert "Use ONLY the context" not in llm.prompts[1]
+
+
+def test_important_questions_go_straight_to_the_fallback(monkeypatch, vectorstore):
+    llm = use_llm(monkeypatch, "Mice sleep more in winter.")
+
+    answers = stream(f"What is the {IMPORTANT_QUESTION_KEYWORDS[0]}?", vectorstore)
+
+    assert answers == ["Mice sleep more in winter."[:n] for n in range(1, 27)]
+    assert len(llm.prompts) == 1
+    assert "Use ONLY the context" not in llm.prompts[0]
@@ -1,23 +1,34 @@
-from typing import List, Optional
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain.chains.question_answering import load_qa_chain
 from langchain.schema.document import Document
 
 from config import (
+    LLM_BACKEND,
     TEMPERATURE,
     K_RETRIEVAL,
     IMPORTANT_QUESTION_KEYWORDS,
     FALLBACK_SECTIONS,
+    SPECULATIVE_FALLBACK,
+    QA_MAX_WORKERS,
+    BATCH_MAX_DOCUMENTS,
 )
 
-from llm_provider import get_llm
+from answer_cache import AnswerCache
+from context_builder import build_context, count_tokens, pack_documents
+from llm_provider import get_llm, get_model_name, llm_slot
+from loader import aload_vectorstore
+from retrieval import batch_retrieve, retrieve
 
 # Constants
 FALLBACK_CHUNK_LIMIT = 5
 
-# Load LLM based on config
-llm = get_llm(temperature=TEMPERATURE)
+# Shared pool for running QA chains concurrently
+_qa_executor = ThreadPoolExecutor(max_workers=QA_MAX_WORKERS, thread_name_prefix="qa")
 
 # Strict QA prompt
 strict_prompt = PromptTemplate(
@@ -56,45 +67,412 @@ Answer:
 """
 )
 
-# QA chains
-qa_chain_strict = load_qa_chain(llm=llm, chain_type="stuff", prompt=strict_prompt)
-qa_chain_flexible = load_qa_chain(llm=llm, chain_type="stuff")  # Unused but reserved
-qa_chain_fallback = LLMChain(llm=llm, prompt=fallback_prompt)
+class QAChains(NamedTuple):
+    llm: object
+    strict: object
+    flexible: object  # Unused but reserved
+    fallback: object
+
+
+# backend -> QA chains over its pooled client, built on first use
+_chains = {}
+_chains_lock = threading.Lock()
+
+
+def get_chains(backend: Optional[str] = None) -> QAChains:
+    """QA chains for an LLM backend (default LLM_BACKEND), chosen per request."""
+    backend = backend or LLM_BACKEND
+    with _chains_lock:
+        chains = _chains.get(backend)
+        if chains is None:
+            from langchain.chains import LLMChain
+            from langchain.chains.question_answering import load_qa_chain
+
+            llm = get_llm(temperature=TEMPERATURE, backend=backend)
+            chains = _chains[backend] = QAChains(
+                llm=llm,
+                strict=load_qa_chain(llm=llm, chain_type="stuff", prompt=strict_prompt),
+                flexible=load_qa_chain(llm=llm, chain_type="stuff"),
+                fallback=LLMChain(llm=llm, prompt=fallback_prompt),
+            )
+    return chains
+
+# Cached answers are only reused while the prompts are unchanged
+PROMPT_VERSION = hashlib.sha256(
+    (strict_prompt.template + fallback_prompt.template).encode()
+).hexdigest()[:12]
+
+answer_cache = AnswerCache()
+
+
+def warm_up(backend: Optional[str] = None) -> None:
+    """Build the objects the first request would otherwise pay for: the
+    embedding model, the LLM client and chains, the tokenizer and the reranker.
+    """
+    from loader import get_embeddings
+    from rerank import get_reranker
+
+    start = time.perf_counter()
+    try:
+        get_embeddings()
+        get_chains(backend)
+        count_tokens("warm up")
+        get_reranker()
+    except Exception as e:
+        # Whatever failed is retried, and reported, on first use
+        print(f"⚠️ Warm-up failed: {e}")
+        return
+    print(f"🔥 Warmed up in {time.perf_counter() - start:.1f}s")
+
+
+def _cache_scope(split_docs, backend=None):
+    # Chunk stores know the content hash of the document they came from
+    doc_key = getattr(split_docs, "key", None)
+    if doc_key is None:
+        return None
+    return doc_key, PROMPT_VERSION, get_model_name(backend)
+
+
+def _query_embedder(vectorstore):
+    embeddings = getattr(vectorstore, "embeddings", None)
+    return embeddings.embed_query if embeddings is not None else None
+
+
+def _is_cacheable(answer: str) -> bool:
+    return not answer.startswith("⚠️")
+
+
+def get_fallback_chunks(split_docs: List[Document]) -> List[Document]:
+    # Indexed chunks carry their section map; plain lists are scanned
+    if hasattr(split_docs, "fallback_chunks"):
+        return split_docs.fallback_chunks(FALLBACK_CHUNK_LIMIT)
+    return [
+        doc for doc in split_docs
+        if any(section in doc.page_content.lower() for section in FALLBACK_SECTIONS)
+    ][:FALLBACK_CHUNK_LIMIT]
+
+
+def is_important_question(query: str) -> bool:
+    return any(keyword in query.lower() for keyword in IMPORTANT_QUESTION_KEYWORDS)
+
+
+def needs_fallback(query: str, strict_answer: str) -> bool:
+    return (
+        "Not found" in strict_answer
+        or len(strict_answer.strip()) < 10
+        or is_important_question(query)
+    )
+
+
+# Decision rules shared by every answer flow (sync, async and streaming), so
+# their fallback behaviour cannot drift apart
+
+NO_CONTENT_ANSWER = "⚠️ No relevant content found in vectorstore."
+
+
+def fallback_first(query: str, split_docs) -> bool:
+    # The keyword rule always discards the strict answer, so skip straight
+    # to the fallback chain instead of paying for both in sequence
+    return bool(split_docs) and is_important_question(query)
+
+
+def falls_back(query: str, strict_answer: str, split_docs) -> bool:
+    return bool(split_docs) and needs_fallback(query, strict_answer)
+
+
+def run_strict(query: str, docs: List[Document], backend: Optional[str] = None) -> str:
+    return get_chains(backend).strict.run(input_documents=pack_documents(docs), question=query)
+
+
+def run_fallback(query: str, split_docs: List[Document], backend: Optional[str] = None) -> str:
+    fallback_context = build_context(get_fallback_chunks(split_docs))
+
+    return get_chains(backend).fallback.run({
+        "context": fallback_context,
+        "question": query
+    })
 
 
 def get_best_answer(
     query: str,
     vectorstore,
-    split_docs: Optional[List[Document]]
+    split_docs: Optional[List[Document]],
+    docs: Optional[List[Document]] = None,
+    backend: Optional[str] = None,
 ) -> str:
-    docs = vectorstore.similarity_search(query, k=K_RETRIEVAL)
+    """Answer a question about one document.
+
+    `docs` may hold chunks already retrieved for the query (for example by
+    retrieval.batch_retrieve); otherwise they are retrieved here. `backend`
+    picks the LLM backend for this request (default LLM_BACKEND).
+    """
+    scope = _cache_scope(split_docs, backend)
+    embed_query = _query_embedder(vectorstore)
+    if scope is not None:
+        cached = answer_cache.get(scope, query, embed_query)
+        if cached is not None:
+            print("⚡ Answer cache hit")
+            return cached
+
+    answer = _answer_question(query, vectorstore, split_docs, docs, backend)
+
+    if scope is not None and _is_cacheable(answer):
+        answer_cache.put(scope, query, answer, embed_query)
+    return answer
+
+
+def get_library_answer(query: str, library, doc_keys=None, backend: Optional[str] = None) -> str:
+    """Answer from the best chunks across a Library, optionally limited to some papers."""
+    docs = library.search(query, k=K_RETRIEVAL, doc_keys=doc_keys)
+    return get_best_answer(query, None, None, docs=docs, backend=backend)
+
+
+def _answer_question(
+    query: str,
+    vectorstore,
+    split_docs: Optional[List[Document]],
+    docs: Optional[List[Document]] = None,
+    backend: Optional[str] = None,
+) -> str:
+    if fallback_first(query, split_docs):
+        print("⚠️ Using fallback context...")
+        return run_fallback(query, split_docs, backend)
+
+    if docs is None:
+        docs = retrieve(vectorstore, query, chunks=split_docs)
 
     if not docs:
-        return "⚠️ No relevant content found in vectorstore."
+        return NO_CONTENT_ANSWER
 
-    strict_answer = qa_chain_strict.run(input_documents=docs, question=query)
+    if SPECULATIVE_FALLBACK and split_docs:
+        # Start the fallback chain alongside the strict one; its answer is
+        # dropped if the strict answer turns out to be good enough
+        strict_future = _qa_executor.submit(run_strict, query, docs, backend)
+        fallback_future = _qa_executor.submit(run_fallback, query, split_docs, backend)
+        strict_answer = strict_future.result()
+        if falls_back(query, strict_answer, split_docs):
+            print("⚠️ Using fallback context...")
+            return fallback_future.result()
+        fallback_future.cancel()
+        return strict_answer
 
-    needs_fallback = (
-        "Not found" in strict_answer
-        or len(strict_answer.strip()) < 10
-        or any(keyword in query.lower() for keyword in IMPORTANT_QUESTION_KEYWORDS)
-    )
+    strict_answer = run_strict(query, docs, backend)
 
-    if needs_fallback and split_docs:
+    if falls_back(query, strict_answer, split_docs):
         print("⚠️ Using fallback context...")
+        return run_fallback(query, split_docs, backend)
+
+    return strict_answer
 
-        fallback_chunks = [
-            doc for doc in split_docs
-            if any(section in doc.page_content.lower() for section in FALLBACK_SECTIONS)
-        ]
 
-        fallback_context = "\n\n".join(
-            doc.page_content for doc in fallback_chunks[:FALLBACK_CHUNK_LIMIT]
-        )
+# ──────────────────────────────
+# Async pipeline: blocking work (retrieval, index loads, cache lookups that may
+# embed) runs in worker threads, LLM calls are awaited under the backend's
+# concurrency limit, so one event loop can serve many users at once
+# ──────────────────────────────
 
-        return qa_chain_fallback.run({
+async def arun_strict(query: str, docs: List[Document], backend: Optional[str] = None) -> str:
+    async with llm_slot(backend):
+        return await get_chains(backend).strict.arun(input_documents=pack_documents(docs), question=query)
+
+
+async def arun_fallback(query: str, split_docs: List[Document], backend: Optional[str] = None) -> str:
+    fallback_context = build_context(get_fallback_chunks(split_docs))
+    async with llm_slot(backend):
+        return await get_chains(backend).fallback.arun({
             "context": fallback_context,
             "question": query
         })
 
+
+async def aget_best_answer(
+    query: str,
+    vectorstore,
+    split_docs: Optional[List[Document]],
+    docs: Optional[List[Document]] = None,
+    backend: Optional[str] = None,
+) -> str:
+    """Async counterpart of get_best_answer."""
+    scope = _cache_scope(split_docs, backend)
+    embed_query = _query_embedder(vectorstore)
+    if scope is not None:
+        cached = await asyncio.to_thread(answer_cache.get, scope, query, embed_query)
+        if cached is not None:
+            print("⚡ Answer cache hit")
+            return cached
+
+    answer = await _aanswer_question(query, vectorstore, split_docs, docs, backend)
+
+    if scope is not None and _is_cacheable(answer):
+        await asyncio.to_thread(answer_cache.put, scope, query, answer, embed_query)
+    return answer
+
+
+async def _aanswer_question(
+    query: str,
+    vectorstore,
+    split_docs: Optional[List[Document]],
+    docs: Optional[List[Document]] = None,
+    backend: Optional[str] = None,
+) -> str:
+    if fallback_first(query, split_docs):
+        print("⚠️ Using fallback context...")
+        return await arun_fallback(query, split_docs, backend)
+
+    if docs is None:
+        docs = await asyncio.to_thread(retrieve, vectorstore, query, split_docs)
+
+    if not docs:
+        return NO_CONTENT_ANSWER
+
+    if SPECULATIVE_FALLBACK and split_docs:
+        fallback_task = asyncio.ensure_future(arun_fallback(query, split_docs, backend))
+        try:
+            strict_answer = await arun_strict(query, docs, backend)
+        except BaseException:
+            fallback_task.cancel()
+            raise
+        if falls_back(query, strict_answer, split_docs):
+            print("⚠️ Using fallback context...")
+            return await fallback_task
+        fallback_task.cancel()
+        return strict_answer
+
+    strict_answer = await arun_strict(query, docs, backend)
+
+    if falls_back(query, strict_answer, split_docs):
+        print("⚠️ Using fallback context...")
+        return await arun_fallback(query, split_docs, backend)
+
     return strict_answer
+
+
+async def _astream_llm(prompt: str, backend: Optional[str] = None) -> AsyncIterator[str]:
+    answer = ""
+    async with llm_slot(backend):
+        async for chunk in get_chains(backend).llm.astream(prompt):
+            answer += getattr(chunk, "content", chunk)
+            yield answer
+
+
+async def astream_best_answer(
+    query: str,
+    vectorstore,
+    split_docs: Optional[List[Document]],
+    backend: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Streaming counterpart of aget_best_answer.
+
+    Yields the answer so far after every token. When the strict answer turns
+    out to need the fallback, the stream restarts with the fallback answer.
+    """
+    scope = _cache_scope(split_docs, backend)
+    embed_query = _query_embedder(vectorstore)
+    if scope is not None:
+        cached = await asyncio.to_thread(answer_cache.get, scope, query, embed_query)
+        if cached is not None:
+            print("⚡ Answer cache hit")
+            yield cached
+            return
+
+    answer = ""
+    async for answer in _astream_answer(query, vectorstore, split_docs, backend):
+        yield answer
+
+    if scope is not None and _is_cacheable(answer):
+        await asyncio.to_thread(answer_cache.put, scope, query, answer, embed_query)
+
+
+async def _astream_answer(
+    query: str,
+    vectorstore,
+    split_docs: Optional[List[Document]],
+    backend: Optional[str] = None,
+) -> AsyncIterator[str]:
+    def fallback_prompt_text():
+        print("⚠️ Using fallback context...")
+        fallback_context = build_context(get_fallback_chunks(split_docs))
+        return fallback_prompt.format(context=fallback_context, question=query)
+
+    if fallback_first(query, split_docs):
+        async for answer in _astream_llm(fallback_prompt_text(), backend):
+            yield answer
+        return
+
+    docs = await asyncio.to_thread(retrieve, vectorstore, query, split_docs)
+
+    if not docs:
+        yield NO_CONTENT_ANSWER
+        return
+
+    context = build_context(docs)
+    strict_answer = ""
+    prompt = strict_prompt.format(context=context, question=query)
+    async for strict_answer in _astream_llm(prompt, backend):
+        yield strict_answer
+
+    if falls_back(query, strict_answer, split_docs):
+        async for answer in _astream_llm(fallback_prompt_text(), backend):
+            yield answer
+
+
+# ──────────────────────────────
+# Batch answering, for evaluation runs over many papers: each document is
+# loaded and searched once for all of its questions, and every LLM call runs
+# concurrently under the backend's limit
+# ──────────────────────────────
+
+async def _aanswer_document(pdf_name: str, questions: List[str], backend, document_slot) -> list:
+    """Answers (or exceptions) for `questions` about one document, in order."""
+    async with document_slot:
+        vectorstore, split_docs = await aload_vectorstore(pdf_name)
+        # Questions that go straight to the fallback chain need no retrieval
+        searched = [q for q in questions if not fallback_first(q, split_docs)]
+        retrieved = dict(zip(
+            searched,
+            await asyncio.to_thread(batch_retrieve, vectorstore, searched, split_docs) if searched else [],
+        ))
+    # The slot is released here, so the next document loads while these answer
+    answers = await asyncio.gather(
+        *(
+            aget_best_answer(q, vectorstore, split_docs, docs=retrieved.get(q), backend=backend)
+            for q in questions
+        ),
+        return_exceptions=True,
+    )
+    print(f"📚 Answered {len(questions)} questions about {pdf_name}")
+    return answers
+
+
+async def aanswer_batch(pairs: List[Tuple[str, str]], backend: Optional[str] = None) -> List[str]:
+    """Answer many (pdf_name, question) pairs; answers come back in input order.
+
+    At most BATCH_MAX_DOCUMENTS documents are loaded and searched at a time.
+    A pair that fails gets an "⚠️ Error: ..." answer and the rest of the
+    batch still completes.
+    """
+    by_document = {}
+    for i, (pdf_name, _) in enumerate(pairs):
+        by_document.setdefault(pdf_name, []).append(i)
+
+    document_slot = asyncio.Semaphore(BATCH_MAX_DOCUMENTS)
+    results = await asyncio.gather(
+        *(
+            _aanswer_document(pdf_name, [pairs[i][1] for i in indexes], backend, document_slot)
+            for pdf_name, indexes in by_document.items()
+        ),
+        return_exceptions=True,
+    )
+
+    answers = [None] * len(pairs)
+    for indexes, result in zip(by_document.values(), results):
+        if isinstance(result, BaseException):
+            result = [result] * len(indexes)
+        for i, answer in zip(indexes, result):
+            answers[i] = f"⚠️ Error: {answer}" if isinstance(answer, BaseException) else answer
+    return answers
+
+
+def answer_batch(pairs: List[Tuple[str, str]], backend: Optional[str] = None) -> List[str]:
+    """Blocking aanswer_batch, for scripts."""
+    return asyncio.run(aanswer_batch(pairs, backend))